@@ -0,0 +1,204 @@
+import asyncio
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from app.db.connection import close_pool
+from app.server import close_stream, dispatch, encode_json, encode_json_stream, is_stream
+
+MAX_HEADERS = 100
+MAX_LINE = 8192
+
+class BadRequest(Exception):
+    pass
+
+class AsyncHTTPServer:
+    """HTTP/1.1 front end running on asyncio.
+
+    Connections, keep-alive and request parsing live on the event loop, so idle
+    clients cost no threads. Each parsed request is passed to the shared
+    dispatch() on a thread pool, since the resource handlers block on psycopg2.
+    """
+
+    def __init__(self, host, port, workers=8, keepalive_timeout=75, max_body_size=1024 * 1024):
+        self.host = host
+        self.port = port
+        self.keepalive_timeout = keepalive_timeout
+        self.max_body_size = max_body_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http-worker')
+        self._server = None
+        self.server_address = None
+        self._connections = {}    # task -> True while a request is being handled
+        self._stopping = None
+        self._loop = None
+
+    async def _read_request(self, reader):
+        """Read one request; returns None when the client closed the connection"""
+        line = await reader.readline()
+        if not line:
+            return None
+        if len(line) > MAX_LINE:
+            raise BadRequest("Request line too long")
+        parts = line.decode('latin-1').rstrip('\r\n').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise BadRequest("Malformed request line")
+        method, target, version = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n'):
+                break
+            if not line:
+                return None
+            if len(headers) >= MAX_HEADERS or len(line) > MAX_LINE:
+                raise BadRequest("Request headers too large")
+            name, sep, value = line.decode('latin-1').partition(':')
+            if not sep:
+                raise BadRequest("Malformed header line")
+            headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise BadRequest("Chunked request bodies are not supported")
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise BadRequest("Invalid Content-Length")
+        if length < 0 or length > self.max_body_size:
+            raise BadRequest("Invalid Content-Length")
+        body = await reader.readexactly(length) if length else b''
+        return method, target, version, headers, body
+
+    def _keep_alive(self, version, headers):
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            return connection != 'close'
+        return connection == 'keep-alive'
+
+    def _head(self, status_code, keep_alive, length=None, chunked=False, headers=None):
+        lines = [
+            f'HTTP/1.1 {status_code} {HTTPStatus(status_code).phrase}',
+            f'Date: {formatdate(usegmt=True)}',
+        ]
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        if status_code != 304 and 'Content-Type' not in (headers or {}):
+            lines.append('Content-Type: application/json')
+        if chunked:
+            lines.append('Transfer-Encoding: chunked')
+        elif length is not None:
+            lines.append(f'Content-Length: {length}')
+        lines.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _write_response(self, writer, status_code, payload, keep_alive, headers=None):
+        """Write an encoded payload, or just the head of a 304 when payload is None"""
+        if payload is None:
+            writer.write(self._head(status_code, keep_alive, headers=headers))
+        else:
+            writer.write(self._head(status_code, keep_alive, length=len(payload), headers=headers) + payload)
+        await writer.drain()
+
+    async def _write_stream(self, writer, status_code, items, version, keep_alive, headers=None):
+        """Write a streamed JSON array, pulling chunks from the blocking iterator on the executor.
+
+        Returns whether the connection can be kept open afterwards.
+        """
+        loop = asyncio.get_running_loop()
+        chunked = version == 'HTTP/1.1'
+        keep_alive = keep_alive and chunked
+        chunks = encode_json_stream(items)
+        try:
+            writer.write(self._head(status_code, keep_alive, chunked=chunked, headers=headers))
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+                if chunk is None:
+                    break
+                writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+                await writer.drain()
+            if chunked:
+                writer.write(b'0\r\n\r\n')
+                await writer.drain()
+            return keep_alive
+        except Exception:
+            # Headers are gone already; dropping the connection marks the body incomplete
+            return False
+        finally:
+            await loop.run_in_executor(self.executor, close_stream, items)
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = False
+        loop = asyncio.get_running_loop()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.keepalive_timeout)
+                except BadRequest as e:
+                    await self._write_response(writer, 400, encode_json({"error": str(e)}), False)
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    # Idle timeout, client went away mid-request or an oversized line
+                    break
+                if request is None:
+                    break
+
+                method, target, version, headers, body = request
+                keep_alive = self._keep_alive(version, headers)
+                self._connections[task] = True
+                try:
+                    response_headers = {}
+                    if method in ('GET', 'POST', 'PUT', 'DELETE'):
+                        status_code, payload, response_headers = await loop.run_in_executor(
+                            self.executor, dispatch, method, target, body, headers)
+                    else:
+                        status_code, payload = 501, encode_json({"error": f"Unsupported method ({method})"})
+                    keep_alive = keep_alive and not self._stopping.is_set()
+                    if is_stream(payload):
+                        keep_alive = await self._write_stream(writer, status_code, payload, version,
+                                                              keep_alive, response_headers)
+                    else:
+                        await self._write_response(writer, status_code, payload, keep_alive,
+                                                   response_headers)
+                finally:
+                    self._connections[task] = False
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def serve_forever(self):
+        """Serve until SIGTERM/SIGINT, then let in-flight requests finish"""
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._stopping = asyncio.Event()
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, self._stopping.set)
+
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_LINE * 2)
+        self.server_address = self._server.sockets[0].getsockname()
+        try:
+            await self._stopping.wait()
+        finally:
+            self._server.close()
+            await self._server.wait_closed()
+            # Idle keep-alive connections are dropped; busy ones finish their response
+            for task, busy in list(self._connections.items()):
+                if not busy:
+                    task.cancel()
+            if self._connections:
+                await asyncio.wait(list(self._connections))
+            self.executor.shutdown(wait=True)
+            close_pool()
+
+    def run(self):
+        asyncio.run(self.serve_forever())
+
+    def stop(self):
+        """Ask a running server to shut down; safe to call from any thread"""
+        self._loop.call_soon_threadsafe(self._stopping.set)
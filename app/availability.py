@@ -0,0 +1,69 @@
+from datetime import datetime, time, timedelta
+
+# Intervals are (start, end) datetime pairs, end exclusive. The functions below
+# keep them sorted and non-overlapping, so each step is a single linear pass.
+
+def merge(intervals):
+    """Sort intervals and merge those that overlap or touch"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def subtract(intervals, removed):
+    """The parts of intervals not covered by removed; both must be merged"""
+    free = []
+    first = 0
+    for start, end in intervals:
+        # Skip what ends before this interval; the rest may reach into later ones
+        while first < len(removed) and removed[first][1] <= start:
+            first += 1
+        i = first
+        while i < len(removed) and removed[i][0] < end:
+            if removed[i][0] > start:
+                free.append((start, removed[i][0]))
+            start = max(start, removed[i][1])
+            i += 1
+        if start < end:
+            free.append((start, end))
+    return free
+
+def opening_intervals(hours, first_day, days):
+    """Opening intervals on each of days dates from first_day, from weekly hours"""
+    week = {}
+    for h in hours:
+        week.setdefault(h.weekday, []).append((h.opens_at, h.closes_at))
+    intervals = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for opens_at, closes_at in week.get(day.weekday(), ()):
+            intervals.append((datetime.combine(day, opens_at), datetime.combine(day, closes_at)))
+    return merge(intervals)
+
+def slot_starts(free, duration, step, not_before=None):
+    """Start times on a step grid (counted from midnight) where duration fits into free time"""
+    starts = []
+    for start, end in free:
+        if not_before and start < not_before:
+            start = not_before
+        midnight = datetime.combine(start.date(), time())
+        # Round start up to the grid
+        start = midnight - (midnight - start) // step * step
+        last = end - duration
+        while start <= last:
+            starts.append(start)
+            start += step
+    return starts
+
+def free_slots(hours, busy, first_day, days, duration, step, not_before=None):
+    """Open start times for an appointment of length duration.
+
+    hours are the medspa's OpeningHours, busy the (start, end) intervals of its
+    appointments in or around the range, in any order.
+    """
+    free = subtract(opening_intervals(hours, first_day, days), merge(busy))
+    return slot_starts(free, duration, step, not_before)
@@ -0,0 +1,53 @@
+import calendar
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+
+EPOCH = datetime(1970, 1, 1)
+
+def version_etag(resource_id, updated_at):
+    """Strong ETag for a single row, derived from its id and updated_at"""
+    micros = (updated_at - EPOCH) // timedelta(microseconds=1)
+    return f'"{resource_id:x}-{micros:x}"'
+
+def body_etag(payload):
+    """Strong ETag for an encoded body that has no single updated_at (e.g. lists)"""
+    return '"%s"' % hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+def validator_headers(etag, updated_at=None):
+    """Response headers announcing the validators; clients must revalidate before reuse"""
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if updated_at is not None:
+        # updated_at is a naive timestamp, taken to be UTC
+        headers['Last-Modified'] = formatdate(calendar.timegm(updated_at.timetuple()), usegmt=True)
+    return headers
+
+def is_conditional(request_headers):
+    return bool(request_headers) and bool(
+        request_headers.get('if-none-match') or request_headers.get('if-modified-since'))
+
+def not_modified(request_headers, etag, updated_at=None):
+    """Whether a GET carrying request_headers can be answered with 304 Not Modified.
+
+    If-None-Match wins over If-Modified-Since when both are sent; the latter
+    only has one-second resolution, so it is checked against updated_at
+    truncated to the second.
+    """
+    if not request_headers:
+        return False
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match:
+        if if_none_match.strip() == '*':
+            return True
+        # GET uses weak comparison, so W/"x" matches "x"
+        return etag in {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    if_modified_since = request_headers.get('if-modified-since')
+    if if_modified_since and updated_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return updated_at.replace(microsecond=0) <= since
+    return False
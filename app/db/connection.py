@@ -1,14 +1,121 @@
 import os
+import threading
+import time
 import psycopg2
-import psycopg2.extras
+import psycopg2.extensions
+from app.db.pool import ConnectionPool
+from app.metrics import metrics
 
-def get_connection():
-    """Get a connection to the database using environment variables"""
+class TimedCursor(psycopg2.extensions.cursor):
+    """Plain cursor charging the time spent in the database to the calling thread's metrics.
+
+    fetchmany() is timed as well: on named (server-side) cursors it fetches
+    from the server.
+    """
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            metrics.add_db_time(time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            metrics.add_db_time(time.perf_counter() - started)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(size) if size is not None else super().fetchmany()
+        finally:
+            metrics.add_db_time(time.perf_counter() - started)
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_pid = None
+_inherited_pools = []
+_thread = threading.local()
+_cursor_factory = TimedCursor
+
+def connect():
+    """Open a new connection to the database using environment variables.
+
+    Cursors return plain tuples; models select explicit column lists and
+    unpack rows positionally.
+    """
     return psycopg2.connect(
         host=os.getenv('DB_HOST', 'localhost'),
         port=os.getenv('DB_PORT', '5432'),
         dbname=os.getenv('DB_NAME', 'medspa'),
         user=os.getenv('DB_USER', 'medspa_user'),
         password=os.getenv('DB_PASSWORD', 'medspa_password'),
-        cursor_factory=psycopg2.extras.DictCursor
-    ) 
\ No newline at end of file
+        cursor_factory=_cursor_factory
+    )
+
+def set_cursor_factory(factory=None):
+    """Create cursors of class factory (None: TimedCursor) on connections opened from now on.
+
+    A hook for instrumenting every statement the models run, e.g. to count
+    queries per request; subclass TimedCursor to keep the DB time metrics.
+    Pooled connections keep the class they were opened with, so set it
+    before the pool is first used.
+    """
+    global _cursor_factory
+    _cursor_factory = factory or TimedCursor
+
+def get_pool():
+    """Get the process-wide connection pool, creating it on first use.
+
+    Pool settings are read from DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+    DB_POOL_MAX_LIFETIME (seconds), DB_POOL_CHECK_AFTER (seconds idle before
+    a connection is pinged on checkout) and DB_POOL_TIMEOUT (seconds to wait
+    for a free connection). A pool inherited across fork() is never reused.
+    """
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            if _pool is not None:
+                # Keep the parent's pool referenced: deallocating its connections
+                # here would terminate the parent's sessions on the shared sockets.
+                _inherited_pools.append(_pool)
+            _pool = ConnectionPool(
+                connect,
+                min_size=int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+                max_size=int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+                check_after=float(os.getenv('DB_POOL_CHECK_AFTER', '30')),
+                timeout=float(os.getenv('DB_POOL_TIMEOUT', '30'))
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+def close_pool():
+    """Close the connection pool, if one was created in this process"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+
+def get_connection():
+    """Borrow a pooled connection; calling close() on it returns it to the pool"""
+    pool = get_pool()
+    if getattr(_thread, 'bound', False):
+        pool.pin_thread()
+    return pool.connection()
+
+def bind_thread():
+    """Pin the connection used by the calling thread to it between requests"""
+    _thread.bound = True
+
+def release_thread():
+    """Hand the calling thread's pinned connection back to the shared pool"""
+    _thread.bound = False
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.unpin_thread()
\ No newline at end of file
@@ -0,0 +1,144 @@
+import os
+import re
+import psycopg2
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+
+# First line of a migration that must run outside a transaction block, such
+# as CREATE INDEX CONCURRENTLY; its statements run one by one in autocommit
+NO_TRANSACTION = '-- migrate: no-transaction'
+
+# Session-level advisory lock serializing migrators started at the same time
+LOCK_KEY = 0x6d656473  # 'meds'
+
+_FILENAME = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+class MigrationError(Exception):
+    pass
+
+class Migration:
+    """One versioned SQL file in MIGRATIONS_DIR, named NNNN_description.sql"""
+    __slots__ = ('version', 'name', 'path')
+
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def sql(self):
+        with open(self.path) as f:
+            return f.read()
+
+    @property
+    def transactional(self):
+        return not self.sql().startswith(NO_TRANSACTION)
+
+    def statements(self):
+        """The ;-separated statements of a no-transaction migration, comments dropped"""
+        lines = [line for line in self.sql().splitlines() if not line.lstrip().startswith('--')]
+        return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+def discover(directory=MIGRATIONS_DIR):
+    """All migrations in directory, ordered by version"""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version = match.group(1)
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version}: {filename}")
+        migrations[version] = Migration(version, f'{version}_{match.group(2)}', os.path.join(directory, filename))
+    return [migrations[version] for version in sorted(migrations)]
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def applied(conn):
+    """version -> applied_at of every recorded migration"""
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        _ensure_table(cur)
+        cur.execute("SELECT version, applied_at FROM schema_migrations")
+        return dict(cur.fetchall())
+    finally:
+        cur.close()
+
+def status(conn, migrations=None):
+    """(migration, applied_at or None) for each migration, in order"""
+    done = applied(conn)
+    return [(migration, done.get(migration.version)) for migration in migrations or discover()]
+
+def _invalid_indexes(cur):
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid AND c.relnamespace = current_schema()::regnamespace
+        ORDER BY c.relname
+    """)
+    return [name for name, in cur.fetchall()]
+
+def _apply_one(conn, migration):
+    cur = conn.cursor()
+    try:
+        if migration.transactional:
+            conn.autocommit = False
+            try:
+                cur.execute(migration.sql())
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                            (migration.version, migration.name))
+                conn.commit()
+            except psycopg2.Error as e:
+                conn.rollback()
+                raise MigrationError(f"{migration.name} failed, nothing of it was applied: {str(e).strip()}") from e
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.autocommit = True
+            return
+
+        # An interrupted CREATE INDEX CONCURRENTLY leaves an invalid index that
+        # IF NOT EXISTS would then skip, so refuse to build over one
+        invalid = _invalid_indexes(cur)
+        if invalid:
+            raise MigrationError(f"Invalid indexes left by an interrupted concurrent build: "
+                                 f"{', '.join(invalid)}; drop them and migrate again")
+        for statement in migration.statements():
+            cur.execute(statement)
+        cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (migration.version, migration.name))
+    finally:
+        cur.close()
+
+def apply(conn, migrations=None, log=print):
+    """Apply pending migrations in version order; returns those applied.
+
+    Each transactional migration commits together with its schema_migrations
+    row. No-transaction migrations are recorded once all their statements
+    succeed, so they must be safe to re-run (IF NOT EXISTS).
+    """
+    migrations = migrations or discover()
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+        try:
+            done = applied(conn)
+            pending = [migration for migration in migrations if migration.version not in done]
+            for migration in pending:
+                log(f'Applying {migration.name}')
+                _apply_one(conn, migration)
+            return pending
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+    finally:
+        cur.close()
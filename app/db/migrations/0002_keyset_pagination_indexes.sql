@@ -0,0 +1,6 @@
+-- migrate: no-transaction
+
+-- Keyset pagination indexes (ORDER BY ... , id with row-value comparisons)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS appointments_start_time_id_idx ON appointments (start_time, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS medspas_name_id_idx ON medspas (name, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS services_medspa_id_name_id_idx ON services (medspa_id, name, id);
@@ -0,0 +1,86 @@
+-- Materialized appointment totals, kept current by the triggers below
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS total_duration INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS total_price NUMERIC(12,2) NOT NULL DEFAULT 0;
+
+-- Existing appointments start from the sum of their services; from here on
+-- the triggers apply every change as a delta
+UPDATE appointments a
+SET total_duration = t.duration,
+    total_price = t.price
+FROM (
+    SELECT aps.appointment_id, SUM(s.duration) AS duration, SUM(s.price) AS price
+    FROM appointment_services aps
+    JOIN services s ON s.id = aps.service_id
+    GROUP BY aps.appointment_id
+) t
+WHERE a.id = t.appointment_id
+  AND (a.total_duration, a.total_price) IS DISTINCT FROM (t.duration, t.price);
+
+-- Links added or removed: apply the linked services' durations and prices as
+-- deltas, one UPDATE per statement (changed is the transition table)
+CREATE OR REPLACE FUNCTION appointment_services_apply_totals() RETURNS trigger AS $$
+DECLARE
+    direction INTEGER := CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END;
+BEGIN
+    UPDATE appointments a
+    SET total_duration = a.total_duration + direction * d.duration,
+        total_price = a.total_price + direction * d.price
+    FROM (
+        SELECT c.appointment_id, SUM(s.duration) AS duration, SUM(s.price) AS price
+        FROM changed c
+        JOIN services s ON s.id = c.service_id
+        GROUP BY c.appointment_id
+    ) d
+    WHERE a.id = d.appointment_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER appointment_services_insert_totals
+    AFTER INSERT ON appointment_services
+    REFERENCING NEW TABLE AS changed
+    FOR EACH STATEMENT EXECUTE FUNCTION appointment_services_apply_totals();
+
+CREATE OR REPLACE TRIGGER appointment_services_delete_totals
+    AFTER DELETE ON appointment_services
+    REFERENCING OLD TABLE AS changed
+    FOR EACH STATEMENT EXECUTE FUNCTION appointment_services_apply_totals();
+
+-- A linked service's price or duration changed: shift every appointment using it
+CREATE OR REPLACE FUNCTION services_apply_totals() RETURNS trigger AS $$
+BEGIN
+    UPDATE appointments a
+    SET total_duration = a.total_duration + d.duration,
+        total_price = a.total_price + d.price
+    FROM (
+        SELECT aps.appointment_id,
+               SUM(n.duration - o.duration) AS duration,
+               SUM(n.price - o.price) AS price
+        FROM new_services n
+        JOIN old_services o ON o.id = n.id
+        JOIN appointment_services aps ON aps.service_id = n.id
+        WHERE n.duration <> o.duration OR n.price <> o.price
+        GROUP BY aps.appointment_id
+    ) d
+    WHERE a.id = d.appointment_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER services_update_totals
+    AFTER UPDATE ON services
+    REFERENCING OLD TABLE AS old_services NEW TABLE AS new_services
+    FOR EACH STATEMENT EXECUTE FUNCTION services_apply_totals();
+
+-- Cascaded link deletes run after the service row is gone, when the delete
+-- trigger above can no longer join it, so unlink while it is still visible
+CREATE OR REPLACE FUNCTION services_remove_totals() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM appointment_services WHERE service_id = OLD.id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER services_delete_totals
+    BEFORE DELETE ON services
+    FOR EACH ROW EXECUTE FUNCTION services_remove_totals();
@@ -0,0 +1,22 @@
+-- Bump updated_at on every real change (including trigger-maintained totals),
+-- so it can back ETag / Last-Modified validators
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    IF NEW IS DISTINCT FROM OLD THEN
+        NEW.updated_at := clock_timestamp();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER medspas_touch_updated_at
+    BEFORE UPDATE ON medspas
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+CREATE OR REPLACE TRIGGER services_touch_updated_at
+    BEFORE UPDATE ON services
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+CREATE OR REPLACE TRIGGER appointments_touch_updated_at
+    BEFORE UPDATE ON appointments
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
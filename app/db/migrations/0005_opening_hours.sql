@@ -0,0 +1,10 @@
+-- Weekly opening hours, several intervals per day allowed (e.g. around a lunch
+-- break); weekday counts from 0 = Monday, times are local like start_time
+CREATE TABLE IF NOT EXISTS medspa_opening_hours (
+    medspa_id INTEGER NOT NULL REFERENCES medspas(id) ON DELETE CASCADE,
+    weekday SMALLINT NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+    opens_at TIME NOT NULL,
+    closes_at TIME NOT NULL,
+    PRIMARY KEY (medspa_id, weekday, opens_at),
+    CHECK (opens_at < closes_at)
+);
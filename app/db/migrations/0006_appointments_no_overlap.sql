@@ -0,0 +1,37 @@
+-- No two scheduled appointments of a medspa may overlap. The GiST index behind
+-- the exclusion constraint finds overlaps in O(log n) and blocks concurrent
+-- conflicting bookings; the check is deferred to commit because adding and
+-- removing services moves total_duration up and down within one statement.
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+DO $$
+DECLARE
+    conflicting TEXT;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'appointments_no_overlap') THEN
+        -- Existing double bookings would fail ADD CONSTRAINT with a bare
+        -- violation; name the appointments starting inside an earlier one instead
+        SELECT string_agg(id::text, ', ' ORDER BY id) INTO conflicting
+        FROM (
+            SELECT id, start_time,
+                   start_time + make_interval(mins => total_duration) AS end_time,
+                   max(start_time + make_interval(mins => total_duration)) OVER (
+                       PARTITION BY medspa_id ORDER BY start_time, id
+                       ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                   ) AS earlier_end
+            FROM appointments
+            WHERE status = 'scheduled'
+        ) scheduled
+        WHERE end_time > start_time AND earlier_end > start_time;
+        IF conflicting IS NOT NULL THEN
+            RAISE EXCEPTION 'Scheduled appointments % overlap earlier ones of the same medspa', conflicting
+                USING HINT = 'List the pairs with "python manage.py find-overlaps", cancel, complete or '
+                             'reschedule one appointment of each, then run "python manage.py migrate apply" again.';
+        END IF;
+        ALTER TABLE appointments ADD CONSTRAINT appointments_no_overlap EXCLUDE USING gist (
+            medspa_id WITH =,
+            tsrange(start_time, start_time + make_interval(mins => total_duration)) WITH &&
+        ) WHERE (status = 'scheduled') DEFERRABLE INITIALLY DEFERRED;
+    END IF;
+END;
+$$;
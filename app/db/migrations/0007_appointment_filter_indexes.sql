@@ -0,0 +1,6 @@
+-- migrate: no-transaction
+
+-- Appointment listing filters: a medspa's or a status's appointments in a
+-- start_time range, in (start_time, id) order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS appointments_medspa_id_start_time_id_idx ON appointments (medspa_id, start_time, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS appointments_status_start_time_id_idx ON appointments (status, start_time, id);
@@ -0,0 +1,10 @@
+-- migrate: no-transaction
+
+-- Lookups by the non-leading or unindexed side of a foreign key:
+-- Service.appointments/delete and the overlap check read links by service_id
+-- (the primary key only serves appointment_id), and the catalog's child
+-- listings filter by their parent and sort by name
+CREATE INDEX CONCURRENTLY IF NOT EXISTS appointment_services_service_id_idx ON appointment_services (service_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS service_types_category_id_name_idx ON service_types (category_id, name);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS service_products_type_id_name_idx ON service_products (type_id, name);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS service_products_supplier_id_name_idx ON service_products (supplier_id, name);
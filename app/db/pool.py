@@ -0,0 +1,241 @@
+import threading
+import time
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolError(Exception):
+    """Raised when no connection can be borrowed from the pool"""
+
+
+class PooledConnection:
+    """Proxy around a borrowed connection; close() hands it back to the pool"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(self._conn, name)
+
+    @property
+    def raw(self):
+        return self._conn
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def close(self):
+        """Return the connection to the pool instead of closing it"""
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        self._pool.putconn(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections.
+
+    Connections are checked for health when borrowed, rolled back when
+    returned and retired once they are older than max_lifetime seconds.
+    Connections idle for longer than check_after seconds are pinged with
+    SELECT 1 before being handed out (0 pings on every checkout).
+
+    Threads that call pin_thread() keep the connection they return in a
+    thread-local slot and get it back on their next checkout, so long-lived
+    workers reuse one session until unpin_thread() hands it back.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, max_lifetime=3600,
+                 check_after=30, timeout=30):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.timeout = timeout
+
+        self._idle = deque()        # (conn, created_at, returned_at)
+        self._created = {}          # id(conn) -> created_at for every live connection
+        self._cond = threading.Condition()
+        self._closed = False
+        self._local = threading.local()
+
+        for _ in range(min_size):
+            conn = self._new_connection()
+            self._idle.append((conn, self._created[id(conn)], time.monotonic()))
+
+    @property
+    def size(self):
+        """Number of live connections, idle or borrowed"""
+        return len(self._created)
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def _new_connection(self):
+        conn = self._connect()
+        self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        self._created.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, created_at, now):
+        return self.max_lifetime is not None and now - created_at >= self.max_lifetime
+
+    def _healthy(self, conn, returned_at, now):
+        """Cheap liveness check, pinging the server only for long-idle connections"""
+        if conn.closed:
+            return False
+        if self.check_after is None or now - returned_at < self.check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+            finally:
+                cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reset(self, conn):
+        """Roll back any open transaction; False if the connection is unusable"""
+        if conn.closed or self._closed:
+            return False
+        try:
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+            return True
+        except psycopg2.Error:
+            return False
+
+    def pin_thread(self):
+        """Give the calling thread its own connection slot"""
+        self._local.pinned = True
+
+    def unpin_thread(self):
+        """Release the calling thread's pinned connection back to the pool"""
+        slot = getattr(self._local, 'slot', None)
+        self._local.pinned = False
+        self._local.slot = None
+        if slot is not None:
+            conn, created_at, returned_at = slot
+            with self._cond:
+                if self._closed or self._expired(created_at, time.monotonic()):
+                    self._discard(conn)
+                else:
+                    self._idle.append(slot)
+                self._cond.notify()
+
+    def _take_pinned(self):
+        slot = getattr(self._local, 'slot', None)
+        if slot is None:
+            return None
+        self._local.slot = None
+        conn, created_at, returned_at = slot
+        now = time.monotonic()
+        if not self._closed and not self._expired(created_at, now) and self._healthy(conn, returned_at, now):
+            return conn
+        with self._cond:
+            self._discard(conn)
+            self._cond.notify()
+        return None
+
+    def getconn(self):
+        """Borrow a connection, opening a new one while below max_size"""
+        if getattr(self._local, 'pinned', False):
+            conn = self._take_pinned()
+            if conn is not None:
+                return conn
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+                    if self._idle:
+                        conn, created_at, returned_at = self._idle.pop()
+                        break
+                    if len(self._created) < self.max_size:
+                        # Reserve the slot, then connect without holding the lock
+                        placeholder = object()
+                        self._created[id(placeholder)] = time.monotonic()
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolError(f"Timed out waiting for a connection (max_size={self.max_size})")
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                break
+            now = time.monotonic()
+            if not self._expired(created_at, now) and self._healthy(conn, returned_at, now):
+                return conn
+            with self._cond:
+                self._discard(conn)
+                self._cond.notify()
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._created.pop(id(placeholder), None)
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created.pop(id(placeholder), None)
+            self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def putconn(self, conn):
+        """Reset a borrowed connection and make it available again"""
+        reusable = self._reset(conn)
+        now = time.monotonic()
+        with self._cond:
+            created_at = self._created.get(id(conn))
+            if not reusable or created_at is None or self._expired(created_at, now):
+                self._discard(conn)
+            elif getattr(self._local, 'pinned', False) and getattr(self._local, 'slot', None) is None:
+                self._local.slot = (conn, created_at, now)
+                return
+            else:
+                self._idle.append((conn, created_at, now))
+            self._cond.notify()
+
+    def connection(self):
+        """Borrow a connection wrapped so that close() returns it"""
+        return PooledConnection(self, self.getconn())
+
+    def close(self):
+        """Close idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
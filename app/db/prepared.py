@@ -0,0 +1,86 @@
+"""Server-side prepared statements for the models' hot queries.
+
+A PreparedStatement wraps ordinary psycopg2 SQL, which stays the single source
+of truth: its PREPARE text is derived from it by numbering the placeholders.
+The first execute() on a connection PREPAREs it, and later calls only send an
+EXECUTE with the parameters, so Postgres skips parsing and, after a few
+executions, planning. The registry remembers which connections hold which
+statements; it holds them weakly, so closed or retired connections drop out
+with their prepared statements. PREPARE is not undone by ROLLBACK, so a
+rolled back transaction leaves the registry accurate.
+
+Models declare PreparedStatements as class attributes, only for statements
+run on nearly every request (single-row reads by id, updated_at checks) and
+for the catalog table loads, which every process repeats whenever its cache
+expires. Everything else is sent as plain SQL.
+
+DB_PREPARED_STATEMENTS=0 runs the plain SQL instead, e.g. behind a
+transaction-pooling PgBouncer, where consecutive statements may land on
+different server sessions.
+"""
+import os
+import re
+import threading
+import weakref
+
+_PLACEHOLDERS = re.compile(r'%%|%\((\w+)\)s|%s')
+
+class PreparedStatements:
+    """Registry of the statement names prepared on each connection"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._prepared = weakref.WeakKeyDictionary()   # connection -> set of names
+        self._lock = threading.Lock()                  # guards adding connections
+        self._names = set()
+
+    def register(self, name):
+        if name in self._names:
+            raise ValueError(f"Prepared statement {name} is already defined")
+        self._names.add(name)
+
+    def prepared_on(self, conn):
+        """Names already prepared on conn (a raw psycopg2 connection), as a mutable set"""
+        names = self._prepared.get(conn)
+        if names is None:
+            with self._lock:
+                names = self._prepared.setdefault(conn, set())
+        return names
+
+class PreparedStatement:
+    """SQL with %s or %(name)s placeholders, PREPAREd on first use per connection"""
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+        parameters = []
+
+        def number(match):
+            if match.group(0) == '%%':
+                return '%'
+            key = match.group(1)
+            if key is None or key not in parameters:
+                parameters.append(key)
+                return f'${len(parameters)}'
+            return f'${parameters.index(key) + 1}'
+
+        self.prepare_sql = f'PREPARE {name} AS {_PLACEHOLDERS.sub(number, sql)}'
+        # Named placeholders in order of their numbers; [None, ...] for positional ones
+        self.parameters = parameters
+        arguments = ', '.join(['%s'] * len(parameters))
+        self.execute_sql = f'EXECUTE {name} ({arguments})' if parameters else f'EXECUTE {name}'
+        registry.register(name)
+
+    def execute(self, cur, params=()):
+        """cur.execute() the statement with params, a sequence or a mapping like the SQL's"""
+        if not registry.enabled:
+            return cur.execute(self.sql, params)
+        prepared = registry.prepared_on(cur.connection)
+        if self.name not in prepared:
+            cur.execute(self.prepare_sql)
+            prepared.add(self.name)
+        if isinstance(params, dict):
+            params = [params[key] for key in self.parameters]
+        return cur.execute(self.execute_sql, params)
+
+registry = PreparedStatements(enabled=os.getenv('DB_PREPARED_STATEMENTS', '1') != '0')
@@ -0,0 +1,176 @@
+"""EXPLAIN every model query and report the ones that can only be answered by
+reading a whole table, i.e. those missing an index.
+
+Each check calls model methods the way the resources do, on a connection whose
+cursors EXPLAIN each statement before running it. Sequential scans are
+disabled for the session, so the planner picks any usable index however small
+the tables are. A Seq Scan left in a plan means there is none, and so does an
+index scan that filters rows without an index condition, or whose condition
+does not constrain the index's leading column: both read the whole index.
+Everything runs in one transaction that is rolled back.
+"""
+from datetime import date, datetime, time, timedelta
+import re
+import psycopg2.extensions
+from app.models.appointment import Appointment
+from app.models.medspa import Medspa
+from app.models.opening_hours import OpeningHours
+from app.models.service import Service
+from app.models.service_category import ServiceCategory
+from app.models.service_product import ServiceProduct
+from app.models.service_product_supplier import ServiceProductSupplier
+from app.models.service_type import ServiceType
+
+# Statements EXPLAIN accepts, EXECUTE of app.db.prepared statements included;
+# PREPARE, SAVEPOINT, SET CONSTRAINTS and the like are just run
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'EXECUTE')
+_INDEX_SCANS = ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan')
+
+_DAY = date(2024, 1, 15)
+_START = datetime.combine(_DAY, time(9))
+
+# (name, function of conn, whether reading the whole table is intended)
+CHECKS = [
+    ('Appointment.get_by_id', lambda conn: Appointment.get_by_id(1, conn), False),
+    ('Appointment.get_updated_at', lambda conn: Appointment.get_updated_at(1, conn), False),
+    ('Appointment.get_by_medspa_id', lambda conn: Appointment.get_by_medspa_id(1, conn), False),
+    ('Appointment.get_all (page)', lambda conn: Appointment.get_all(conn, limit=51, after=(_START, 1)), False),
+    ('Appointment.get_all (day)', lambda conn: Appointment.get_all(conn, start_date=_DAY, end_date=_DAY), False),
+    ('Appointment.get_all (medspa week)', lambda conn: Appointment.get_all(
+        conn, medspa_id=1, start_date=_DAY, end_date=_DAY + timedelta(days=6)), False),
+    ('Appointment.get_all (statuses month)', lambda conn: Appointment.get_all(
+        conn, status=['scheduled', 'completed'], start_date=_DAY, end_date=_DAY + timedelta(days=30)), False),
+    ('Appointment.iter_all', lambda conn: list(Appointment.iter_all(conn, status='completed', start_date=_DAY)), False),
+    ('Appointment.get_busy_intervals', lambda conn: Appointment.get_busy_intervals(
+        1, _START, _START + timedelta(days=7), conn), False),
+    ('Appointment.find_overlapping (appointment)', lambda conn: Appointment.find_overlapping(conn, appointment_id=1), False),
+    ('Appointment.find_overlapping (service)', lambda conn: Appointment.find_overlapping(conn, service_id=1), False),
+    ('Appointment.services', lambda conn: Appointment(id=1, medspa_id=1).services(conn), False),
+    ('Appointment.add_services', lambda conn: Appointment(id=1, medspa_id=1).add_services([1, 2], conn), False),
+    ('Appointment.replace_services', lambda conn: Appointment(id=1, medspa_id=1).replace_services([1, 2], conn), False),
+    ('Appointment.refresh_totals', lambda conn: Appointment(id=1).refresh_totals(conn), False),
+    ('Appointment.save (update)', lambda conn: Appointment(id=1, medspa_id=1, start_time=_START).save(conn), False),
+    ('Appointment.delete', lambda conn: Appointment(id=1).delete(conn), False),
+    ('Appointment.find_total_drift', lambda conn: Appointment.find_total_drift(conn), True),
+    ('Appointment.recompute_totals', lambda conn: Appointment.recompute_totals(conn), True),
+    ('Appointment.find_overlapping_pairs', lambda conn: Appointment.find_overlapping_pairs(conn), True),
+    ('Medspa.get_by_id', lambda conn: Medspa.get_by_id(1, conn), False),
+    ('Medspa.get_updated_at', lambda conn: Medspa.get_updated_at(1, conn), False),
+    ('Medspa.get_all (page)', lambda conn: Medspa.get_all(conn, limit=51, after=('a', 1)), False),
+    ('Medspa.save (update)', lambda conn: Medspa(id=1, name='a', address='a', phone_number='a',
+                                                email_address='a').save(conn), False),
+    ('Medspa.delete', lambda conn: Medspa(id=1).delete(conn), False),
+    ('OpeningHours.get_by_medspa_id', lambda conn: OpeningHours.get_by_medspa_id(1, conn), False),
+    ('OpeningHours.replace_for_medspa', lambda conn: OpeningHours.replace_for_medspa(
+        1, [OpeningHours(1, 0, time(9), time(17))], conn), False),
+    ('Service.get_by_id', lambda conn: Service.get_by_id(1, conn), False),
+    ('Service.get_updated_at', lambda conn: Service.get_updated_at(1, conn), False),
+    ('Service.get_by_medspa_id (page)', lambda conn: Service.get_by_medspa_id(1, conn, limit=51, after=('a', 1)), False),
+    ('Service.appointments', lambda conn: Service(id=1).appointments(conn), False),
+    ('Service.save (update)', lambda conn: Service(id=1, name='a').save(conn), False),
+    ('Service.delete', lambda conn: Service(id=1).delete(conn), False),
+    ('Service.get_all', lambda conn: Service.get_all(conn), True),
+    ('ServiceCategory.get_all', lambda conn: ServiceCategory.get_all(conn), True),
+    ('ServiceType.get_all', lambda conn: ServiceType.get_all(conn), True),
+    ('ServiceType.get_by_category_id', lambda conn: ServiceType.get_by_category_id(1, conn), False),
+    ('ServiceProduct.get_all', lambda conn: ServiceProduct.get_all(conn), True),
+    ('ServiceProduct.get_by_type_id', lambda conn: ServiceProduct.get_by_type_id(1, conn), False),
+    ('ServiceProduct.get_by_supplier_id', lambda conn: ServiceProduct.get_by_supplier_id(1, conn), False),
+    ('ServiceProductSupplier.get_all', lambda conn: ServiceProductSupplier.get_all(conn), True),
+    ('ServiceProductSupplier.delete', lambda conn: ServiceProductSupplier(id=1).delete(conn), False),
+]
+
+def leading_columns(conn):
+    """btree index name -> its first column (or expression) as EXPLAIN prints it.
+
+    A btree condition that skips the first column has to read the whole index;
+    GiST can search on any of its columns, so those are left out.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT c.relname, pg_get_indexdef(i.indexrelid, 1, true)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE c.relnamespace = current_schema()::regnamespace AND am.amname = 'btree'
+        """)
+        return dict(cur.fetchall())
+    finally:
+        cur.close()
+
+def _constrains(condition, column):
+    # Unqualified, so a.id in a join condition does not count for id
+    return re.search(r'(?<![\w.])' + re.escape(column) + r'(?!\w)', condition) is not None
+
+def full_scans(plan, leading=None):
+    """Tables (or indexes) read in full anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    node = plan.get('Node Type')
+    scanned = plan.get('Relation Name') or plan.get('Index Name')
+    if node == 'Seq Scan':
+        tables = [scanned]
+    elif node in _INDEX_SCANS and 'Index Cond' not in plan:
+        # A walk in index order for ORDER BY ... LIMIT is fine; filtering along one is not
+        tables = [scanned] if 'Filter' in plan else []
+    elif node in _INDEX_SCANS and leading and plan['Index Name'] in leading:
+        tables = [] if _constrains(plan['Index Cond'], leading[plan['Index Name']]) else [scanned]
+    else:
+        tables = []
+    for child in plan.get('Plans', ()):
+        tables.extend(full_scans(child, leading))
+    return tables
+
+def explaining_cursor(explained, leading=None):
+    """Cursor class that appends (query, fully scanned tables) to explained before each execute"""
+    class ExplainingCursor(psycopg2.extensions.cursor):
+        def execute(self, query, vars=None):
+            text = query.decode() if isinstance(query, bytes) else query
+            if text.lstrip().split(None, 1)[0].upper() in _EXPLAINABLE:
+                cur = self.connection.cursor(cursor_factory=psycopg2.extensions.cursor)
+                try:
+                    cur.execute('EXPLAIN (FORMAT JSON) ' + text, vars)
+                    plan = cur.fetchone()[0][0]['Plan']
+                    explained.append((' '.join(text.split()), full_scans(plan, leading)))
+                finally:
+                    cur.close()
+            return super().execute(query, vars)
+    return ExplainingCursor
+
+def run(conn, checks=CHECKS):
+    """Run checks; returns (name, full_scan_ok, [(query, fully scanned tables)], error) for each"""
+    results = []
+    conn.cursor_factory = psycopg2.extensions.cursor
+    leading = leading_columns(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute("SET LOCAL enable_seqscan = off")
+        for name, check, full_scan_ok in checks:
+            explained = []
+            conn.cursor_factory = explaining_cursor(explained, leading)
+            cur.execute("SAVEPOINT query_check")
+            error = None
+            try:
+                check(conn)
+            except Exception as e:
+                # Sample ids may not exist; the statements were explained before running
+                error = e
+            finally:
+                conn.cursor_factory = psycopg2.extensions.cursor
+                cur.execute("ROLLBACK TO SAVEPOINT query_check")
+            results.append((name, full_scan_ok, explained, error))
+    finally:
+        cur.close()
+        conn.rollback()
+    return results
+
+def failures(results):
+    """Checks that read a whole table they should not, or explained nothing"""
+    failed = []
+    for name, full_scan_ok, explained, error in results:
+        if not explained:
+            failed.append((name, f'no statement was explained ({error})'))
+        elif not full_scan_ok:
+            for query, tables in explained:
+                if tables:
+                    failed.append((name, f'full scan of {", ".join(tables)}: {query[:120]}'))
+    return failed
@@ -0,0 +1,118 @@
+"""Per-request query tracing: which statements a request ran, how long each
+took and how many rows it touched.
+
+Enabled with DB_TRACE=1, which makes connections opened from then on create
+TracingCursors. dispatch() opens a trace around each request; when it ends, a
+statement shape (the SQL with placeholders, literals and whitespace
+normalized) run more than DB_TRACE_REPEAT_LIMIT times is logged as a probable
+N+1. Statements slower than DB_SLOW_QUERY_MS are logged as they finish, in or
+out of a request. With DB_TRACE_SERVER_TIMING=1 responses carry a
+Server-Timing header with the request's DB time and statement count.
+
+Only normalized text is logged, never parameters. A streamed body is read
+after its request's trace has ended, so its statements count towards the
+slow query log only.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from app.db import connection
+
+log = logging.getLogger(__name__)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|%\(\w+\)s|%s|(?<![\w$])\d+(?:\.\d+)?")
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+@lru_cache(maxsize=1024)
+def normalize(query):
+    """Statement shape: placeholders and literals as ?, lists of them as (?...), whitespace squeezed"""
+    if isinstance(query, bytes):
+        query = query.decode()
+    shape = _LITERALS.sub('?', _SPACE.sub(' ', query).strip())
+    return _LISTS.sub('(?...)', shape)
+
+class Trace:
+    """Statements one request ran, as (shape, seconds, rows) with rows None when unknown"""
+    __slots__ = ('label', 'statements')
+
+    def __init__(self, label):
+        self.label = label
+        self.statements = []
+
+    @property
+    def db_seconds(self):
+        return sum(seconds for _, seconds, _ in self.statements)
+
+    def repeated(self, limit):
+        """(shape, executions) of the shapes run more than limit times"""
+        counts = Counter(shape for shape, _, _ in self.statements)
+        return [(shape, count) for shape, count in counts.most_common() if count > limit]
+
+    def server_timing(self):
+        """Server-Timing header value with the DB time in milliseconds"""
+        return f'db;dur={self.db_seconds * 1000:.1f};desc="{len(self.statements)} queries"'
+
+class Tracer:
+    """Collects each thread's statements into the trace of the request it is handling"""
+
+    def __init__(self, enabled=False, repeat_limit=10, slow_seconds=0.1, server_timing=False):
+        self.enabled = enabled
+        self.repeat_limit = repeat_limit
+        self.slow_seconds = slow_seconds
+        self.server_timing = server_timing
+        self._local = threading.local()
+
+    def begin(self, label):
+        """Start recording the calling thread's statements; returns the new trace"""
+        trace = self._local.trace = Trace(label)
+        return trace
+
+    def end(self, trace):
+        """Stop recording into trace and log the statement shapes it repeated too often"""
+        self._local.trace = None
+        for shape, count in trace.repeated(self.repeat_limit):
+            log.warning('%s ran %d times, probable N+1: %s', trace.label, count, shape)
+
+    def record(self, query, seconds, rows):
+        """Add a finished statement to the calling thread's trace, logging it if slow"""
+        trace = getattr(self._local, 'trace', None)
+        if trace is None and seconds < self.slow_seconds:
+            return
+        shape = normalize(query)
+        if trace is not None:
+            trace.statements.append((shape, seconds, rows))
+        if seconds >= self.slow_seconds:
+            log.warning('Slow query, %.1f ms, %s rows%s: %s', seconds * 1000, rows,
+                        f' in {trace.label}' if trace is not None else '', shape)
+
+class TracingCursor(connection.TimedCursor):
+    """TimedCursor that reports each statement to the tracer"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            tracer.record(query, time.perf_counter() - started, self.rowcount if self.rowcount >= 0 else None)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            tracer.record(query, time.perf_counter() - started, self.rowcount if self.rowcount >= 0 else None)
+
+tracer = Tracer(
+    enabled=os.getenv('DB_TRACE', '') == '1',
+    repeat_limit=int(os.getenv('DB_TRACE_REPEAT_LIMIT', '10')),
+    slow_seconds=float(os.getenv('DB_SLOW_QUERY_MS', '100')) / 1000,
+    server_timing=os.getenv('DB_TRACE_SERVER_TIMING', '') == '1'
+)
+
+if tracer.enabled:
+    connection.set_cursor_factory(TracingCursor)
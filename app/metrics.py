@@ -0,0 +1,161 @@
+"""Process-local request metrics, exposed in the Prometheus text format.
+
+Each thread records into its own shard of plain dicts, so the request path
+takes no locks; render() adds the shards of every thread up when /metrics is
+scraped. A scrape may see a request half-recorded (counted in one series but
+not yet in another), which Prometheus tolerates. In prefork mode every worker
+process keeps its own metrics.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds, in seconds, of the latency and DB time histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class _RouteStats:
+    """One thread's counts for one method and route.
+
+    Histograms are lists of one count per bucket, the count above the last
+    bucket and the sum of observed values.
+    """
+    __slots__ = ('in_flight', 'request_bytes', 'response_bytes', 'latency', 'db')
+
+    def __init__(self, buckets):
+        self.in_flight = 0         # requests started minus finished
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency = {}          # status code -> histogram
+        self.db = [0] * (len(buckets) + 1) + [0.0]
+
+class _Shard:
+    """One thread's share of every series"""
+    __slots__ = ('routes', 'db_seconds')
+
+    def __init__(self):
+        self.routes = {}           # (method, route) -> _RouteStats
+        self.db_seconds = 0.0      # running total of this thread's time in the database
+
+class Metrics:
+    """Per-route request latency, DB time, in-flight and byte counts"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()   # guards _shards, taken once per thread
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _stats(self, method, route):
+        try:
+            routes = self._local.shard.routes
+        except AttributeError:
+            routes = self._shard().routes
+        key = (method, route)
+        stats = routes.get(key)
+        if stats is None:
+            stats = routes[key] = _RouteStats(self.buckets)
+        return stats
+
+    def add_db_time(self, seconds):
+        """Charge seconds spent waiting on the database to the calling thread"""
+        self._shard().db_seconds += seconds
+
+    def db_time(self):
+        """The calling thread's running DB time; subtract two readings for one request's share"""
+        return self._shard().db_seconds
+
+    def start(self, method, route):
+        """Count a request as in flight; returns its start time and the thread's db_time()"""
+        self._stats(method, route).in_flight += 1
+        return time.perf_counter(), self._local.shard.db_seconds
+
+    def finish(self, method, route, status_code, started, db_seconds, request_bytes, response_bytes):
+        """Record a request begun with start(), possibly on another thread"""
+        elapsed = time.perf_counter() - started
+        stats = self._stats(method, route)
+        stats.in_flight -= 1
+        stats.request_bytes += request_bytes
+        stats.response_bytes += response_bytes
+        latency = stats.latency.get(status_code)
+        if latency is None:
+            latency = stats.latency[status_code] = [0] * (len(self.buckets) + 1) + [0.0]
+        latency[bisect_left(self.buckets, elapsed)] += 1
+        latency[-1] += elapsed
+        db = stats.db
+        db[bisect_left(self.buckets, db_seconds)] += 1
+        db[-1] += db_seconds
+
+    def _merged(self):
+        """Every series summed over all shards, keyed by (method, route) or (method, route, status)"""
+        with self._lock:
+            shards = list(self._shards)
+        latency, db, in_flight, request_bytes, response_bytes = {}, {}, {}, {}, {}
+
+        def add(series, key, histogram):
+            merged = series.get(key)
+            series[key] = list(histogram) if merged is None else [a + b for a, b in zip(merged, histogram)]
+
+        for shard in shards:
+            # Copies are atomic under the GIL; the owning thread may be writing meanwhile
+            for key, stats in shard.routes.copy().items():
+                in_flight[key] = in_flight.get(key, 0) + stats.in_flight
+                request_bytes[key] = request_bytes.get(key, 0) + stats.request_bytes
+                response_bytes[key] = response_bytes.get(key, 0) + stats.response_bytes
+                add(db, key, stats.db)
+                for status_code, histogram in stats.latency.copy().items():
+                    add(latency, (*key, status_code), histogram)
+        return latency, db, in_flight, request_bytes, response_bytes
+
+    def _histogram_lines(self, name, histograms, label_names):
+        lines = []
+        for key in sorted(histograms):
+            histogram = histograms[key]
+            labels = ','.join(f'{label}="{value}"' for label, value in zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += histogram[len(self.buckets)]
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram[-1]}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        return lines
+
+    def _value_lines(self, name, values):
+        return [f'{name}{{method="{method}",route="{route}"}} {value}'
+                for (method, route), value in sorted(values.items())]
+
+    def render(self):
+        """All series in the Prometheus text exposition format, as bytes"""
+        latency, db, in_flight, request_bytes, response_bytes = self._merged()
+        lines = [
+            '# HELP http_request_duration_seconds Time from routing a request to its last response byte.',
+            '# TYPE http_request_duration_seconds histogram',
+            *self._histogram_lines('http_request_duration_seconds', latency, ('method', 'route', 'status')),
+            '# HELP http_request_db_seconds Time a request spent in database calls.',
+            '# TYPE http_request_db_seconds histogram',
+            *self._histogram_lines('http_request_db_seconds', db, ('method', 'route')),
+            '# HELP http_requests_in_flight Requests being handled or streamed.',
+            '# TYPE http_requests_in_flight gauge',
+            *self._value_lines('http_requests_in_flight', in_flight),
+            '# HELP http_request_body_bytes_total Request body bytes received.',
+            '# TYPE http_request_body_bytes_total counter',
+            *self._value_lines('http_request_body_bytes_total', request_bytes),
+            '# HELP http_response_body_bytes_total Response body bytes sent.',
+            '# TYPE http_response_body_bytes_total counter',
+            *self._value_lines('http_response_body_bytes_total', response_bytes),
+        ]
+        return ('\n'.join(lines) + '\n').encode()
+
+metrics = Metrics()
@@ -1 +1,6 @@
- 
\ No newline at end of file
+"""Model classes, one per table.
+
+Each model has one __slots__ entry per table column, in column order, and
+COLUMNS joins them. Rows come back as plain tuples that from_db_row() unpacks
+positionally, so every query selects COLUMNS explicitly instead of *.
+"""
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from app.db.connection import get_connection
+
+class CatalogCache:
+    """Process-local copy of the small, rarely changing catalog tables.
+
+    Each model's table (ServiceCategory, ServiceType, ServiceProduct,
+    ServiceProductSupplier) is loaded with one get_all() on first use and then
+    served from memory. Writers call invalidate() after committing; entries
+    also expire after ttl seconds so other processes pick up changes, and
+    get_by_id() reloads once before reporting an unknown id, which another
+    process may have just created. Returned objects are shared and must be treated as read-only.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tables = {}         # model -> (loaded_at, rows, rows_by_id)
+        self._generations = {}    # model -> bumped on every invalidation
+
+    def _load(self, model, conn):
+        generation = self._generations.get(model, 0)
+        if conn is None:
+            conn = get_connection()
+            try:
+                rows = model.get_all(conn)
+            finally:
+                conn.close()
+        else:
+            rows = model.get_all(conn)
+        entry = (time.monotonic(), rows, {row.id: row for row in rows})
+        with self._lock:
+            # Don't store a snapshot that an invalidation raced with
+            if self._generations.get(model, 0) == generation:
+                self._tables[model] = entry
+        return entry
+
+    def _entry(self, model, conn):
+        """(entry, whether it was loaded by this call)"""
+        entry = self._tables.get(model)
+        if entry is None or (self.ttl is not None and time.monotonic() - entry[0] >= self.ttl):
+            return self._load(model, conn), True
+        return entry, False
+
+    def get_all(self, model, conn=None):
+        """All rows of model's table, in get_all() order; conn is only used on a miss"""
+        return list(self._entry(model, conn)[0][1])
+
+    def get_by_id(self, model, id, conn=None):
+        try:
+            id = int(id)
+        except (TypeError, ValueError):
+            return None
+        entry, loaded = self._entry(model, conn)
+        row = entry[2].get(id)
+        if row is None and not loaded:
+            # Possibly created by another process since the load; look once more
+            row = self._load(model, conn)[2].get(id)
+        return row
+
+    def invalidate(self, *models):
+        """Drop cached tables; call after the transaction that changed them commits"""
+        with self._lock:
+            for model in models or list(self._tables):
+                self._generations[model] = self._generations.get(model, 0) + 1
+                self._tables.pop(model, None)
+
+catalog = CatalogCache(ttl=float(os.getenv('CATALOG_CACHE_TTL', '60')))
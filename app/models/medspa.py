@@ -1,8 +1,16 @@
 from app.db.connection import get_connection
+from app.db.prepared import PreparedStatement
 from app.models.appointment import Appointment
 from app.models.service import Service
 
 class Medspa:
+    __slots__ = ('id', 'name', 'address', 'phone_number', 'email_address', 'created_at',
+                 'updated_at')
+    COLUMNS = ', '.join(__slots__)
+
+    _BY_ID = PreparedStatement('medspa_by_id', f"SELECT {COLUMNS} FROM medspas WHERE id = %s")
+    _UPDATED_AT = PreparedStatement('medspa_updated_at', "SELECT updated_at FROM medspas WHERE id = %s")
+
     def __init__(self, id=None, name=None, address=None, phone_number=None, email_address=None, created_at=None, updated_at=None):
         self.id = id
         self.name = name
@@ -35,15 +43,17 @@ class Medspa:
     def from_db_row(row):
         if not row:
             return None
-        return Medspa(
-            id=row['id'],
-            name=row['name'],
-            address=row['address'],
-            phone_number=row['phone_number'],
-            email_address=row['email_address'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at']
-        )
+        return Medspa(*row)
+
+    JSON_FIELDS = (
+        ('id', 'int'),
+        ('name', 'str'),
+        ('address', 'str'),
+        ('phone_number', 'str'),
+        ('email_address', 'str'),
+        ('created_at', 'datetime'),
+        ('updated_at', 'datetime')
+    )
 
     def to_dict(self):
         return {
@@ -57,10 +67,21 @@ class Medspa:
         }
 
     @classmethod
-    def get_all(cls, conn):
+    def get_all(cls, conn, limit=None, after=None):
+        """Get medspas ordered by (name, id), optionally one keyset page after a (name, id) pair"""
+        query = f"SELECT {cls.COLUMNS} FROM medspas"
+        params = []
+        if after:
+            query += " WHERE (name, id) > (%s, %s)"
+            params.extend(after)
+        query += " ORDER BY name, id"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM medspas")
+            cur.execute(query, tuple(params))
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
@@ -70,24 +91,35 @@ class Medspa:
     def get_by_id(cls, medspa_id, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM medspas WHERE id = %s", (medspa_id,))
+            cls._BY_ID.execute(cur, (medspa_id,))
             row = cur.fetchone()
             return cls.from_db_row(row)
         finally:
             cur.close()
 
+    @classmethod
+    def get_updated_at(cls, medspa_id, conn):
+        """Only the row's updated_at, for freshness checks; None if the medspa doesn't exist"""
+        cur = conn.cursor()
+        try:
+            cls._UPDATED_AT.execute(cur, (medspa_id,))
+            row = cur.fetchone()
+            return row[0] if row else None
+        finally:
+            cur.close()
+
     def save(self, conn):
         cur = conn.cursor()
         try:
             if self.id:
                 cur.execute(
-                    """
+                    f"""
                     UPDATE medspas 
                     SET name = %s,
                         address = %s,
                         phone_number = %s,
                         email_address = %s
-                    WHERE id = %s RETURNING *
+                    WHERE id = %s RETURNING {self.COLUMNS}
                     """,
                     (self.name, self.address, self.phone_number, self.email_address, self.id)
                 )
@@ -96,9 +128,9 @@ class Medspa:
                     raise ValueError("All fields are required")
                     
                 cur.execute(
-                    """
+                    f"""
                     INSERT INTO medspas (name, address, phone_number, email_address)
-                    VALUES (%s, %s, %s, %s) RETURNING *
+                    VALUES (%s, %s, %s, %s) RETURNING {self.COLUMNS}
                     """,
                     (self.name, self.address, self.phone_number, self.email_address)
                 )
@@ -106,13 +138,8 @@ class Medspa:
             row = cur.fetchone()
             
             # Update instance with DB values
-            self.id = row['id']
-            self.name = row['name']
-            self.address = row['address']
-            self.phone_number = row['phone_number']
-            self.email_address = row['email_address']
-            self.created_at = row['created_at']
-            self.updated_at = row['updated_at']
+            (self.id, self.name, self.address, self.phone_number, self.email_address,
+             self.created_at, self.updated_at) = row
             return self
         finally:
             cur.close()
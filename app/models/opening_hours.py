@@ -0,0 +1,102 @@
+from datetime import time
+
+class OpeningHours:
+    """One opening interval of a medspa on a weekday (0 = Monday ... 6 = Sunday)"""
+    __slots__ = ('medspa_id', 'weekday', 'opens_at', 'closes_at')
+    COLUMNS = ', '.join(__slots__)
+
+    def __init__(self, medspa_id=None, weekday=None, opens_at=None, closes_at=None):
+        self.medspa_id = medspa_id
+        self.weekday = weekday
+        self.opens_at = opens_at
+        self.closes_at = closes_at
+
+    @staticmethod
+    def from_db_row(row):
+        if not row:
+            return None
+        return OpeningHours(*row)
+
+    @staticmethod
+    def from_dict(data, medspa_id):
+        """Validate one {"weekday", "opens_at", "closes_at"} entry of a request body"""
+        if not isinstance(data, dict):
+            raise ValueError("Opening hours must be objects with weekday, opens_at and closes_at")
+        weekday = data.get('weekday')
+        if type(weekday) is not int or not 0 <= weekday <= 6:
+            raise ValueError("weekday must be an integer from 0 (Monday) to 6 (Sunday)")
+        try:
+            opens_at = time.fromisoformat(data['opens_at'])
+            closes_at = time.fromisoformat(data['closes_at'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("opens_at and closes_at must be times in HH:MM format")
+        if opens_at >= closes_at:
+            raise ValueError("opens_at must be before closes_at")
+        return OpeningHours(medspa_id, weekday, opens_at, closes_at)
+
+    JSON_FIELDS = (
+        ('weekday', 'int'),
+        ('opens_at', 'time'),
+        ('closes_at', 'time')
+    )
+
+    def to_dict(self):
+        return {
+            'weekday': self.weekday,
+            'opens_at': self.opens_at,
+            'closes_at': self.closes_at
+        }
+
+    @classmethod
+    def get_by_medspa_id(cls, medspa_id, conn):
+        """The medspa's week, ordered by weekday and opening time"""
+        cur = conn.cursor()
+        try:
+            cur.execute(f"""
+                SELECT {cls.COLUMNS} FROM medspa_opening_hours
+                WHERE medspa_id = %s
+                ORDER BY weekday, opens_at
+            """, (medspa_id,))
+            rows = cur.fetchall()
+            return [cls.from_db_row(row) for row in rows]
+        finally:
+            cur.close()
+
+    @classmethod
+    def replace_for_medspa(cls, medspa_id, hours, conn):
+        """Replace the medspa's whole week with hours in one statement.
+
+        Raises ValueError if two intervals on the same weekday overlap.
+        Returns the stored hours in get_by_medspa_id order.
+        """
+        ordered = sorted(hours, key=lambda h: (h.weekday, h.opens_at))
+        for previous, current in zip(ordered, ordered[1:]):
+            if previous.weekday == current.weekday and current.opens_at < previous.closes_at:
+                raise ValueError(f"Opening hours overlap on weekday {current.weekday}")
+
+        cur = conn.cursor()
+        try:
+            # The insert reads removed, so the old rows are gone before the new
+            # ones are checked against the primary key
+            cur.execute(f"""
+                WITH removed AS (
+                    DELETE FROM medspa_opening_hours
+                    WHERE medspa_id = %(medspa_id)s
+                    RETURNING 1
+                )
+                INSERT INTO medspa_opening_hours ({cls.COLUMNS})
+                SELECT %(medspa_id)s, h.weekday, h.opens_at, h.closes_at
+                FROM unnest(%(weekdays)s::smallint[], %(opens)s::time[], %(closes)s::time[])
+                     AS h(weekday, opens_at, closes_at)
+                WHERE (SELECT count(*) FROM removed) >= 0
+                RETURNING {cls.COLUMNS}
+            """, {
+                'medspa_id': medspa_id,
+                'weekdays': [h.weekday for h in ordered],
+                'opens': [h.opens_at for h in ordered],
+                'closes': [h.closes_at for h in ordered]
+            })
+            rows = cur.fetchall()
+            return sorted((cls.from_db_row(row) for row in rows), key=lambda h: (h.weekday, h.opens_at))
+        finally:
+            cur.close()
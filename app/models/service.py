@@ -1,10 +1,21 @@
 from app.db.connection import get_connection
+from app.db.prepared import PreparedStatement
 from app.models.service_category import ServiceCategory
 from app.models.service_type import ServiceType
 from app.models.service_product import ServiceProduct
+from app.models.catalog_cache import catalog
 from datetime import datetime
 
 class Service:
+    __slots__ = ('id', 'medspa_id', 'category_id', 'type_id', 'product_id', 'name', 'description',
+                 'price', 'duration', 'created_at', 'updated_at')
+    COLUMNS = ', '.join(__slots__)
+    # The same, qualified for UPDATE ... FROM, where bare names would be ambiguous
+    _UPDATED_COLUMNS = ', '.join('s.' + column for column in __slots__)
+
+    _BY_ID = PreparedStatement('service_by_id', f"SELECT {COLUMNS} FROM services WHERE id = %s")
+    _UPDATED_AT = PreparedStatement('service_updated_at', "SELECT updated_at FROM services WHERE id = %s")
+
     def __init__(self, id=None, medspa_id=None, category_id=None, type_id=None, product_id=None,
                  name=None, description=None, price=None, duration=None, created_at=None, updated_at=None):
         self.id = id
@@ -23,29 +34,19 @@ class Service:
         """Get the category of this service"""
         if not self.category_id:
             return None
-        return ServiceCategory.get_by_id(self.category_id, conn)
+        return catalog.get_by_id(ServiceCategory, self.category_id, conn)
 
     def type(self, conn):
         """Get the type of this service"""
         if not self.type_id:
             return None
-        return ServiceType.get_by_id(self.type_id, conn)
+        return catalog.get_by_id(ServiceType, self.type_id, conn)
 
     def product(self, conn):
         """Get the product used in this service"""
         if not self.product_id:
             return None
-        return ServiceProduct.get_by_id(self.product_id, conn)
-
-    def validate_hierarchy(self, conn):
-        """Validate that category/type/product follow the correct hierarchy"""
-        type_obj = ServiceType.get_by_id(self.type_id, conn)
-        if type_obj.category_id != self.category_id:
-            raise ValueError("Type must belong to the specified category")
-
-        product_obj = ServiceProduct.get_by_id(self.product_id, conn)
-        if product_obj.type_id != self.type_id:
-            raise ValueError("Product must belong to the specified type")
+        return catalog.get_by_id(ServiceProduct, self.product_id, conn)
 
     def appointments(self, conn):
         """Get all appointments that include this service"""
@@ -60,7 +61,7 @@ class Service:
                 SELECT appointment_id FROM appointment_services
                 WHERE service_id = %s
             """, (self.id,))
-            appointment_ids = [row['appointment_id'] for row in cur.fetchall()]
+            appointment_ids = [appointment_id for appointment_id, in cur.fetchall()]
             return [Appointment.get_by_id(aid, conn) for aid in appointment_ids]
         finally:
             cur.close()
@@ -127,19 +128,21 @@ class Service:
     def from_db_row(row):
         if not row:
             return None
-        return Service(
-            id=row['id'],
-            medspa_id=row['medspa_id'],
-            category_id=row['category_id'],
-            type_id=row['type_id'],
-            product_id=row['product_id'],
-            name=row['name'],
-            description=row['description'],
-            price=row['price'],
-            duration=row['duration'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at']
-        )
+        return Service(*row)
+
+    JSON_FIELDS = (
+        ('id', 'int'),
+        ('medspa_id', 'int'),
+        ('category_id', 'int'),
+        ('type_id', 'int'),
+        ('product_id', 'int'),
+        ('name', 'str'),
+        ('description', 'str'),
+        ('price', 'decimal'),
+        ('duration', 'int'),
+        ('created_at', 'datetime'),
+        ('updated_at', 'datetime')
+    )
 
     def to_dict(self):
         return {
@@ -160,7 +163,7 @@ class Service:
     def get_all(cls, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM services ORDER BY name")
+            cur.execute(f"SELECT {cls.COLUMNS} FROM services ORDER BY name")
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
@@ -170,88 +173,161 @@ class Service:
     def get_by_id(cls, service_id, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM services WHERE id = %s", (service_id,))
+            cls._BY_ID.execute(cur, (service_id,))
             row = cur.fetchone()
             return cls.from_db_row(row)
         finally:
             cur.close()
 
     @classmethod
-    def get_by_medspa_id(cls, medspa_id, conn):
-        """Get all services for a specific medspa"""
+    def get_updated_at(cls, service_id, conn):
+        """Only the row's updated_at, for freshness checks; None if the service doesn't exist"""
+        cur = conn.cursor()
+        try:
+            cls._UPDATED_AT.execute(cur, (service_id,))
+            row = cur.fetchone()
+            return row[0] if row else None
+        finally:
+            cur.close()
+
+    @classmethod
+    def get_by_medspa_id(cls, medspa_id, conn, limit=None, after=None):
+        """Get all services for a specific medspa, ordered by (name, id).
+
+        Pass the last seen (name, id) pair as after and a limit to read one
+        keyset page at a time.
+        """
+        query = f"SELECT {cls.COLUMNS} FROM services WHERE medspa_id = %s"
+        params = [medspa_id]
+        if after:
+            query += " AND (name, id) > (%s, %s)"
+            params.extend(after)
+        query += " ORDER BY name, id"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM services WHERE medspa_id = %s ORDER BY name", (medspa_id,))
+            cur.execute(query, tuple(params))
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
             cur.close()
 
     def save(self, conn):
+        """Insert or update this service in a single statement.
+
+        The category -> type -> product hierarchy is checked inside the same
+        statement (a CTE guarding the INSERT/UPDATE), so a write is one round
+        trip. Raises ValueError for an invalid hierarchy; returns None when
+        updating a service that does not exist.
+        """
+        params = {
+            'id': self.id,
+            'medspa_id': self.medspa_id,
+            'category_id': self.category_id,
+            'type_id': self.type_id,
+            'product_id': self.product_id,
+            'name': self.name,
+            'description': self.description,
+            'price': self.price,
+            'duration': self.duration
+        }
         cur = conn.cursor()
         try:
             if self.id:
-                # UPDATE: Get existing record to merge with updates
-                cur.execute("SELECT * FROM services WHERE id = %s", (self.id,))
-                existing = cur.fetchone()
-                if not existing:
-                    raise ValueError("Service not found")
-
-                # Merge existing values with updates
-                category_id = self.category_id if self.category_id is not None else existing['category_id']
-                type_id = self.type_id if self.type_id is not None else existing['type_id']
-                product_id = self.product_id if self.product_id is not None else existing['product_id']
-                
-                # If we have all three, validate the hierarchy
-                if all([category_id, type_id, product_id]):
-                    self.category_id = category_id
-                    self.type_id = type_id
-                    self.product_id = product_id
-                    self.validate_hierarchy(conn)
-
+                # UPDATE: merge the given fields over the existing row, then
+                # validate the merged hierarchy before writing
                 cur.execute(
-                    """
-                    UPDATE services 
-                    SET medspa_id = COALESCE(%s, medspa_id),
-                        category_id = COALESCE(%s, category_id),
-                        type_id = COALESCE(%s, type_id),
-                        product_id = COALESCE(%s, product_id),
-                        name = COALESCE(%s, name),
-                        description = COALESCE(%s, description),
-                        price = COALESCE(%s, price),
-                        duration = COALESCE(%s, duration)
-                    WHERE id = %s RETURNING *
+                    f"""
+                    WITH merged AS (
+                        SELECT id,
+                               COALESCE(%(category_id)s::integer, category_id) AS category_id,
+                               COALESCE(%(type_id)s::integer, type_id) AS type_id,
+                               COALESCE(%(product_id)s::integer, product_id) AS product_id
+                        FROM services
+                        WHERE id = %(id)s
+                    ),
+                    checked AS (
+                        SELECT m.*,
+                               COALESCE(t.category_id = m.category_id, false) AS type_ok,
+                               COALESCE(p.type_id = m.type_id, false) AS product_ok
+                        FROM merged m
+                        LEFT JOIN service_types t ON t.id = m.type_id
+                        LEFT JOIN service_products p ON p.id = m.product_id
+                    ),
+                    updated AS (
+                        UPDATE services s
+                        SET medspa_id = COALESCE(%(medspa_id)s::integer, s.medspa_id),
+                            category_id = c.category_id,
+                            type_id = c.type_id,
+                            product_id = c.product_id,
+                            name = COALESCE(%(name)s::text, s.name),
+                            description = COALESCE(%(description)s::text, s.description),
+                            price = COALESCE(%(price)s::numeric, s.price),
+                            duration = COALESCE(%(duration)s::integer, s.duration)
+                        FROM checked c
+                        WHERE s.id = c.id AND c.type_ok AND c.product_ok
+                        RETURNING {self._UPDATED_COLUMNS}
+                    )
+                    SELECT c.type_ok, c.product_ok, u.*
+                    FROM checked c
+                    LEFT JOIN updated u ON u.id = c.id
                     """,
-                    (self.medspa_id, self.category_id, self.type_id, self.product_id,
-                     self.name, self.description, self.price, self.duration, self.id)
+                    params
                 )
             else:
                 # CREATE: All required fields must be present
                 if not all([self.medspa_id, self.name, self.price, self.duration,
                           self.category_id, self.type_id, self.product_id]):
                     raise ValueError("Missing required fields")
-                    
-                # Validate hierarchy before saving
-                self.validate_hierarchy(conn)
-                
+
                 cur.execute(
-                    """
-                    INSERT INTO services (
-                        medspa_id, category_id, type_id, product_id,
-                        name, description, price, duration
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING *
+                    f"""
+                    WITH checked AS (
+                        SELECT EXISTS (
+                                   SELECT 1 FROM service_types
+                                   WHERE id = %(type_id)s AND category_id = %(category_id)s
+                               ) AS type_ok,
+                               EXISTS (
+                                   SELECT 1 FROM service_products
+                                   WHERE id = %(product_id)s AND type_id = %(type_id)s
+                               ) AS product_ok
+                    ),
+                    inserted AS (
+                        INSERT INTO services (
+                            medspa_id, category_id, type_id, product_id,
+                            name, description, price, duration
+                        )
+                        SELECT %(medspa_id)s::integer, %(category_id)s::integer,
+                               %(type_id)s::integer, %(product_id)s::integer,
+                               %(name)s::text, %(description)s::text,
+                               %(price)s::numeric, %(duration)s::integer
+                        FROM checked
+                        WHERE type_ok AND product_ok
+                        RETURNING {self.COLUMNS}
+                    )
+                    SELECT c.type_ok, c.product_ok, i.*
+                    FROM checked c
+                    LEFT JOIN inserted i ON true
                     """,
-                    (self.medspa_id, self.category_id, self.type_id, self.product_id,
-                     self.name, self.description, self.price, self.duration)
+                    params
                 )
             
             row = cur.fetchone()
+            if not row:
+                return None
+            type_ok, product_ok = row[:2]
+            if not type_ok:
+                raise ValueError("Type must belong to the specified category")
+            if not product_ok:
+                raise ValueError("Product must belong to the specified type")
             
             # Update instance with DB values
-            self.id = row['id']
-            self.created_at = row['created_at']
-            self.updated_at = row['updated_at']
+            (self.id, self.medspa_id, self.category_id, self.type_id, self.product_id,
+             self.name, self.description, self.price, self.duration, self.created_at,
+             self.updated_at) = row[2:]
             return self
         finally:
             cur.close()
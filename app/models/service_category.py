@@ -1,6 +1,12 @@
 from app.db.connection import get_connection
+from app.db.prepared import PreparedStatement
 
 class ServiceCategory:
+    __slots__ = ('id', 'name')
+    COLUMNS = ', '.join(__slots__)
+
+    _ALL = PreparedStatement('service_category_all', f"SELECT {COLUMNS} FROM service_categories ORDER BY name")
+
     def __init__(self, id=None, name=None):
         self.id = id
         self.name = name
@@ -16,10 +22,12 @@ class ServiceCategory:
     def from_db_row(row):
         if not row:
             return None
-        return ServiceCategory(
-            id=row['id'],
-            name=row['name']
-        )
+        return ServiceCategory(*row)
+
+    JSON_FIELDS = (
+        ('id', 'int'),
+        ('name', 'str')
+    )
 
     def to_dict(self):
         return {
@@ -31,7 +39,7 @@ class ServiceCategory:
     def get_all(cls, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_categories ORDER BY name")
+            cls._ALL.execute(cur)
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
@@ -41,7 +49,7 @@ class ServiceCategory:
     def get_by_id(cls, category_id, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_categories WHERE id = %s", (category_id,))
+            cur.execute(f"SELECT {cls.COLUMNS} FROM service_categories WHERE id = %s", (category_id,))
             row = cur.fetchone()
             return cls.from_db_row(row)
         finally:
@@ -52,10 +60,10 @@ class ServiceCategory:
         try:
             if self.id:
                 cur.execute(
-                    """
+                    f"""
                     UPDATE service_categories 
                     SET name = %s
-                    WHERE id = %s RETURNING *
+                    WHERE id = %s RETURNING {self.COLUMNS}
                     """,
                     (self.name, self.id)
                 )
@@ -64,9 +72,9 @@ class ServiceCategory:
                     raise ValueError("Category name is required")
                     
                 cur.execute(
-                    """
+                    f"""
                     INSERT INTO service_categories (name)
-                    VALUES (%s) RETURNING *
+                    VALUES (%s) RETURNING {self.COLUMNS}
                     """,
                     (self.name,)
                 )
@@ -74,8 +82,7 @@ class ServiceCategory:
             row = cur.fetchone()
             
             # Update instance with DB values
-            self.id = row['id']
-            self.name = row['name']
+            (self.id, self.name) = row
             return self
         finally:
             cur.close()
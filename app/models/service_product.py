@@ -1,6 +1,12 @@
 from app.db.connection import get_connection
+from app.db.prepared import PreparedStatement
 
 class ServiceProduct:
+    __slots__ = ('id', 'type_id', 'supplier_id', 'name')
+    COLUMNS = ', '.join(__slots__)
+
+    _ALL = PreparedStatement('service_product_all', f"SELECT {COLUMNS} FROM service_products ORDER BY name")
+
     def __init__(self, id=None, type_id=None, supplier_id=None, name=None):
         self.id = id
         self.type_id = type_id
@@ -25,12 +31,14 @@ class ServiceProduct:
     def from_db_row(row):
         if not row:
             return None
-        return ServiceProduct(
-            id=row['id'],
-            type_id=row['type_id'],
-            supplier_id=row['supplier_id'],
-            name=row['name']
-        )
+        return ServiceProduct(*row)
+
+    JSON_FIELDS = (
+        ('id', 'int'),
+        ('type_id', 'int'),
+        ('supplier_id', 'int'),
+        ('name', 'str')
+    )
 
     def to_dict(self):
         return {
@@ -44,7 +52,7 @@ class ServiceProduct:
     def get_all(cls, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_products ORDER BY name")
+            cls._ALL.execute(cur)
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
@@ -54,7 +62,7 @@ class ServiceProduct:
     def get_by_id(cls, product_id, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_products WHERE id = %s", (product_id,))
+            cur.execute(f"SELECT {cls.COLUMNS} FROM service_products WHERE id = %s", (product_id,))
             row = cur.fetchone()
             return cls.from_db_row(row)
         finally:
@@ -65,7 +73,7 @@ class ServiceProduct:
         """Get all products of a specific type"""
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_products WHERE type_id = %s ORDER BY name", (type_id,))
+            cur.execute(f"SELECT {cls.COLUMNS} FROM service_products WHERE type_id = %s ORDER BY name", (type_id,))
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
@@ -76,7 +84,7 @@ class ServiceProduct:
         """Get all products from a specific supplier"""
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_products WHERE supplier_id = %s ORDER BY name", (supplier_id,))
+            cur.execute(f"SELECT {cls.COLUMNS} FROM service_products WHERE supplier_id = %s ORDER BY name", (supplier_id,))
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
@@ -87,12 +95,12 @@ class ServiceProduct:
         try:
             if self.id:
                 cur.execute(
-                    """
+                    f"""
                     UPDATE service_products 
                     SET name = %s,
                         type_id = %s,
                         supplier_id = %s
-                    WHERE id = %s RETURNING *
+                    WHERE id = %s RETURNING {self.COLUMNS}
                     """,
                     (self.name, self.type_id, self.supplier_id, self.id)
                 )
@@ -105,9 +113,9 @@ class ServiceProduct:
                     raise ValueError("Product must be associated with a supplier")
                     
                 cur.execute(
-                    """
+                    f"""
                     INSERT INTO service_products (name, type_id, supplier_id)
-                    VALUES (%s, %s, %s) RETURNING *
+                    VALUES (%s, %s, %s) RETURNING {self.COLUMNS}
                     """,
                     (self.name, self.type_id, self.supplier_id)
                 )
@@ -115,10 +123,7 @@ class ServiceProduct:
             row = cur.fetchone()
             
             # Update instance with DB values
-            self.id = row['id']
-            self.name = row['name']
-            self.type_id = row['type_id']
-            self.supplier_id = row['supplier_id']
+            (self.id, self.type_id, self.supplier_id, self.name) = row
             return self
         finally:
             cur.close()
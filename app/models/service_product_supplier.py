@@ -1,6 +1,12 @@
 from app.db.connection import get_connection
+from app.db.prepared import PreparedStatement
 
 class ServiceProductSupplier:
+    __slots__ = ('id', 'name')
+    COLUMNS = ', '.join(__slots__)
+
+    _ALL = PreparedStatement('service_product_supplier_all', f"SELECT {COLUMNS} FROM service_product_suppliers ORDER BY name")
+
     def __init__(self, id=None, name=None):
         self.id = id
         self.name = name
@@ -16,10 +22,12 @@ class ServiceProductSupplier:
     def from_db_row(row):
         if not row:
             return None
-        return ServiceProductSupplier(
-            id=row['id'],
-            name=row['name']
-        )
+        return ServiceProductSupplier(*row)
+
+    JSON_FIELDS = (
+        ('id', 'int'),
+        ('name', 'str')
+    )
 
     def to_dict(self):
         return {
@@ -31,7 +39,7 @@ class ServiceProductSupplier:
     def get_all(cls, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_product_suppliers ORDER BY name")
+            cls._ALL.execute(cur)
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
@@ -41,7 +49,7 @@ class ServiceProductSupplier:
     def get_by_id(cls, supplier_id, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_product_suppliers WHERE id = %s", (supplier_id,))
+            cur.execute(f"SELECT {cls.COLUMNS} FROM service_product_suppliers WHERE id = %s", (supplier_id,))
             row = cur.fetchone()
             return cls.from_db_row(row)
         finally:
@@ -52,10 +60,10 @@ class ServiceProductSupplier:
         try:
             if self.id:
                 cur.execute(
-                    """
+                    f"""
                     UPDATE service_product_suppliers 
                     SET name = %s
-                    WHERE id = %s RETURNING *
+                    WHERE id = %s RETURNING {self.COLUMNS}
                     """,
                     (self.name, self.id)
                 )
@@ -64,9 +72,9 @@ class ServiceProductSupplier:
                     raise ValueError("Supplier name is required")
                     
                 cur.execute(
-                    """
+                    f"""
                     INSERT INTO service_product_suppliers (name)
-                    VALUES (%s) RETURNING *
+                    VALUES (%s) RETURNING {self.COLUMNS}
                     """,
                     (self.name,)
                 )
@@ -74,8 +82,7 @@ class ServiceProductSupplier:
             row = cur.fetchone()
             
             # Update instance with DB values
-            self.id = row['id']
-            self.name = row['name']
+            (self.id, self.name) = row
             return self
         finally:
             cur.close()
@@ -88,7 +95,7 @@ class ServiceProductSupplier:
         try:
             # First check if there are any products using this supplier
             cur.execute("SELECT COUNT(*) FROM service_products WHERE supplier_id = %s", (self.id,))
-            count = cur.fetchone()['count']
+            count = cur.fetchone()[0]
             if count > 0:
                 raise ValueError(f"Cannot delete supplier: {count} products are associated with this supplier")
 
@@ -1,6 +1,12 @@
 from app.db.connection import get_connection
+from app.db.prepared import PreparedStatement
 
 class ServiceType:
+    __slots__ = ('id', 'category_id', 'name')
+    COLUMNS = ', '.join(__slots__)
+
+    _ALL = PreparedStatement('service_type_all', f"SELECT {COLUMNS} FROM service_types ORDER BY name")
+
     def __init__(self, id=None, category_id=None, name=None):
         self.id = id
         self.category_id = category_id
@@ -24,11 +30,13 @@ class ServiceType:
     def from_db_row(row):
         if not row:
             return None
-        return ServiceType(
-            id=row['id'],
-            category_id=row['category_id'],
-            name=row['name']
-        )
+        return ServiceType(*row)
+
+    JSON_FIELDS = (
+        ('id', 'int'),
+        ('category_id', 'int'),
+        ('name', 'str')
+    )
 
     def to_dict(self):
         return {
@@ -41,7 +49,7 @@ class ServiceType:
     def get_all(cls, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_types ORDER BY name")
+            cls._ALL.execute(cur)
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
@@ -51,7 +59,7 @@ class ServiceType:
     def get_by_id(cls, type_id, conn):
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_types WHERE id = %s", (type_id,))
+            cur.execute(f"SELECT {cls.COLUMNS} FROM service_types WHERE id = %s", (type_id,))
             row = cur.fetchone()
             return cls.from_db_row(row)
         finally:
@@ -62,7 +70,7 @@ class ServiceType:
         """Get all types in a specific category"""
         cur = conn.cursor()
         try:
-            cur.execute("SELECT * FROM service_types WHERE category_id = %s ORDER BY name", (category_id,))
+            cur.execute(f"SELECT {cls.COLUMNS} FROM service_types WHERE category_id = %s ORDER BY name", (category_id,))
             rows = cur.fetchall()
             return [cls.from_db_row(row) for row in rows]
         finally:
@@ -73,11 +81,11 @@ class ServiceType:
         try:
             if self.id:
                 cur.execute(
-                    """
+                    f"""
                     UPDATE service_types 
                     SET name = %s,
                         category_id = %s
-                    WHERE id = %s RETURNING *
+                    WHERE id = %s RETURNING {self.COLUMNS}
                     """,
                     (self.name, self.category_id, self.id)
                 )
@@ -88,9 +96,9 @@ class ServiceType:
                     raise ValueError("Type must be associated with a category")
                     
                 cur.execute(
-                    """
+                    f"""
                     INSERT INTO service_types (name, category_id)
-                    VALUES (%s, %s) RETURNING *
+                    VALUES (%s, %s) RETURNING {self.COLUMNS}
                     """,
                     (self.name, self.category_id)
                 )
@@ -98,9 +106,7 @@ class ServiceType:
             row = cur.fetchone()
             
             # Update instance with DB values
-            self.id = row['id']
-            self.name = row['name']
-            self.category_id = row['category_id']
+            (self.id, self.category_id, self.name) = row
             return self
         finally:
             cur.close()
@@ -0,0 +1,123 @@
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+STOP_SIGNALS = {signal.SIGTERM, signal.SIGINT}
+
+class PreforkSupervisor:
+    """Runs a pool of forked worker processes that share one listening port.
+
+    By default the supervisor binds the socket and every worker inherits the
+    descriptor; with reuse_port each worker binds its own SO_REUSEPORT socket
+    and the kernel spreads connections between them. Workers that exit are
+    replaced. SIGTERM/SIGINT are forwarded so workers drain in-flight requests,
+    and stragglers are killed after drain_timeout seconds.
+    """
+
+    RESTART_DELAY = 1.0
+
+    def __init__(self, server_address, worker_main, processes=None, reuse_port=False,
+                 drain_timeout=30, backlog=128):
+        self.server_address = server_address
+        self.worker_main = worker_main
+        self.processes = processes or os.cpu_count() or 1
+        self.reuse_port = reuse_port
+        self.drain_timeout = drain_timeout
+        self.backlog = backlog
+        self.socket = None
+        self._children = {}       # pid -> (slot, started_at)
+        self._stopping = False
+        self._stop_deadline = None
+
+    def _listen(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(self.server_address)
+        sock.listen(self.backlog)
+        return sock
+
+    def _spawn(self, slot):
+        # Block shutdown signals across fork() so a new worker never runs the
+        # supervisor's handler with its copy of the child table
+        signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+        pid = os.fork()
+        if pid:
+            self._children[pid] = (slot, time.monotonic())
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+            return
+        # Worker process: never returns into the supervisor loop
+        code = 0
+        try:
+            for signum in STOP_SIGNALS:
+                signal.signal(signum, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+            sock = self._listen() if self.reuse_port else self.socket
+            self.worker_main(sock)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def _signal_children(self, signum):
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _stop(self, signum, frame):
+        if not self._stopping:
+            self._stopping = True
+            self._stop_deadline = time.monotonic() + self.drain_timeout
+            self._signal_children(signal.SIGTERM)
+
+    def _reap(self):
+        """Collect exited workers and return the slots that need replacing"""
+        freed = []
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                break
+            if pid == 0:
+                break
+            slot, started_at = self._children.pop(pid, (None, None))
+            if slot is None:
+                continue
+            if not self._stopping:
+                print(f'Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting',
+                      file=sys.stderr)
+            freed.append((slot, started_at))
+        return freed
+
+    def run(self):
+        if not self.reuse_port:
+            self.socket = self._listen()
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, self._stop)
+        try:
+            for slot in range(self.processes):
+                self._spawn(slot)
+            while self._children:
+                for slot, started_at in self._reap():
+                    if self._stopping:
+                        continue
+                    # Back off when a worker dies right after starting (e.g. a bad deploy)
+                    if time.monotonic() - started_at < self.RESTART_DELAY:
+                        time.sleep(self.RESTART_DELAY)
+                    self._spawn(slot)
+                if self._stopping and time.monotonic() > self._stop_deadline:
+                    self._signal_children(signal.SIGKILL)
+                time.sleep(0.1)
+        finally:
+            if self.socket is not None:
+                self.socket.close()
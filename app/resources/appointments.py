@@ -1,10 +1,12 @@
 import json
 from app.db.connection import get_connection
-from app.models.appointment import Appointment
+from app.models.appointment import Appointment, AppointmentConflictError, ServiceAttachmentError
 from app.models.medspa import Medspa
-from app.models.service import Service
+from app.resources import errors, pagination
 from datetime import datetime
 
+EXPORT_BATCH_SIZE = 1000
+
 def create(data):
     """Create a new appointment"""
     conn = get_connection()
@@ -27,22 +29,23 @@ def create(data):
         appointment = Appointment(**data)
         appointment.save(conn=conn)
         
-        # Add services if provided
-        for service_id in service_ids:
-            service = Service.get_by_id(service_id, conn=conn)
-            if not service:
-                conn.rollback()
-                return 404, {"error": f"Service {service_id} not found"}
-            try:
-                appointment.add_service(service, conn=conn)
-            except ValueError as e:
-                conn.rollback()
-                return 400, {"error": str(e)}
+        # Attach all services with one validating statement
+        try:
+            appointment.add_services(service_ids, conn=conn)
+        except ServiceAttachmentError as e:
+            conn.rollback()
+            return errors.service_attachment_error(e)
         
-        # Get response with totals
+        # Pick up the totals the triggers stored for the new links
+        if service_ids:
+            appointment.refresh_totals(conn)
+        
+        try:
+            Appointment.check_overlaps(conn, appointment_id=appointment.id)
+        except AppointmentConflictError as e:
+            conn.rollback()
+            return errors.appointment_conflict(e)
         result = appointment.to_dict()
-        result['total_duration'] = appointment.total_duration(conn)
-        result['total_price'] = appointment.total_price(conn)
         
         conn.commit()
         return 201, result
@@ -55,7 +58,7 @@ def create(data):
     finally:
         conn.close()
 
-def get_by_id(appointment_id):
+def get_by_id(appointment_id, query_params=None):
     """Get an appointment by ID"""
     conn = get_connection()
     try:
@@ -63,47 +66,115 @@ def get_by_id(appointment_id):
         if not appointment:
             return 404, {"error": "Appointment not found"}
             
-        result = appointment.to_dict()
-        result['total_duration'] = appointment.total_duration(conn)
-        result['total_price'] = appointment.total_price(conn)
-        
-        return 200, result
+        return 200, appointment
     except Exception as e:
         return 500, {"error": str(e)}
     finally:
         conn.close()
 
+def get_updated_at(appointment_id):
+    """Get when an appointment last changed, or None if it doesn't exist"""
+    conn = get_connection()
+    try:
+        return Appointment.get_updated_at(appointment_id, conn)
+    except Exception:
+        # Fall through to get_by_id, which answers the request and reports the error
+        return None
+    finally:
+        conn.close()
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+
+def parse_filters(query_params):
+    """Read the listing filters from the query string into Appointment.get_all keywords.
+
+    status may be repeated or comma-separated. start_date and end_date bound an
+    inclusive date range; start_date alone selects that single day.
+    """
+    filters = {}
+    if 'status' in query_params:
+        values = query_params['status']
+        values = [values] if isinstance(values, str) else values
+        statuses = [s for value in values for s in value.split(',') if s]
+        invalid = [s for s in statuses if s not in Appointment.STATUSES]
+        if invalid:
+            raise ValueError(f"Invalid status: {', '.join(invalid)}")
+        filters['status'] = statuses
+    if 'medspa_id' in query_params:
+        try:
+            filters['medspa_id'] = int(query_params['medspa_id'])
+        except (TypeError, ValueError):
+            raise ValueError("medspa_id must be an integer")
+    if 'start_date' in query_params:
+        filters['start_date'] = _parse_date(query_params['start_date'])
+        filters['end_date'] = filters['start_date']
+    if 'end_date' in query_params:
+        filters['end_date'] = _parse_date(query_params['end_date'])
+        if filters.get('start_date') and filters['end_date'] < filters['start_date']:
+            raise ValueError("end_date must not be before start_date")
+    return filters
+
 def get_all(query_params=None):
-    """Get all appointments, optionally filtered by status or date"""
+    """Get all appointments, optionally filtered by status, medspa and date range.
+
+    Passing limit and/or cursor returns one page as {"items": [...], "next": cursor}.
+    """
     conn = get_connection()
     try:
-        status = None
-        start_date = None
+        filters = {}
+        limit = None
+        after = None
         
         if query_params:
-            status = query_params.get('status')
-            if 'start_date' in query_params:
+            try:
+                filters = parse_filters(query_params)
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            if pagination.is_requested(query_params):
                 try:
-                    start_date = datetime.strptime(query_params['start_date'], '%Y-%m-%d').date()
-                except ValueError:
-                    return 400, {"error": "Invalid date format. Use YYYY-MM-DD"}
+                    limit, after = pagination.parse(query_params, datetime, int)
+                except ValueError as e:
+                    return 400, {"error": str(e)}
         
-        appointments = Appointment.get_all(status=status, start_date=start_date, conn=conn)
-                
-        # Add total duration and price to each appointment
-        results = []
-        for appointment in appointments:
-            result = appointment.to_dict()
-            result['total_duration'] = appointment.total_duration(conn)
-            result['total_price'] = appointment.total_price(conn)
-            results.append(result)
-            
-        return 200, results
+        # Fetch one extra row to learn whether another page follows
+        appointments = Appointment.get_all(conn=conn, limit=limit + 1 if limit else None, after=after,
+                                           **filters)
+
+
+        if limit:
+            return 200, pagination.page(appointments, limit, lambda a: (a.start_time, a.id))
+        return 200, appointments
     except Exception as e:
         return 500, {"error": str(e)}
     finally:
         conn.close()
 
+def export(query_params=None):
+    """Stream all appointments, with the same filters as get_all, as a JSON array.
+
+    The response data is a generator, which the server writes out incrementally
+    while rows are read from a server-side cursor in batches.
+    """
+    filters = {}
+    if query_params:
+        try:
+            filters = parse_filters(query_params)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+    return 200, _export_rows(filters)
+
+def _export_rows(filters):
+    conn = get_connection()
+    try:
+        for batch in Appointment.iter_all(conn, batch_size=EXPORT_BATCH_SIZE, **filters):
+            yield from batch
+    finally:
+        conn.close()
+
 def update(data, appointment_id):
     """Update an appointment"""
     conn = get_connection()
@@ -123,30 +194,23 @@ def update(data, appointment_id):
         if 'start_time' in data:
             appointment.start_time = data['start_time']
         
-        # Handle services if provided
+        # Replace the linked services with one diff-based statement
         if 'service_ids' in data:
-            # Remove all current services
-            for service in appointment.services(conn=conn):
-                appointment.remove_service(service, conn=conn)
-            
-            # Add new services
-            for service_id in data['service_ids']:
-                service = Service.get_by_id(service_id, conn=conn)
-                if not service:
-                    conn.rollback()
-                    return 404, {"error": f"Service {service_id} not found"}
-                try:
-                    appointment.add_service(service, conn=conn)
-                except ValueError as e:
-                    conn.rollback()
-                    return 400, {"error": str(e)}
+            try:
+                appointment.replace_services(data['service_ids'], conn=conn)
+            except ServiceAttachmentError as e:
+                conn.rollback()
+                return errors.service_attachment_error(e)
         
+        # save() re-reads the row, including totals updated by the link triggers
         appointment.save(conn=conn)
         
-        # Get response with totals
+        try:
+            Appointment.check_overlaps(conn, appointment_id=appointment.id)
+        except AppointmentConflictError as e:
+            conn.rollback()
+            return errors.appointment_conflict(e)
         result = appointment.to_dict()
-        result['total_duration'] = appointment.total_duration(conn)
-        result['total_price'] = appointment.total_price(conn)
         
         conn.commit()
         return 200, result
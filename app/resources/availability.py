@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+from app import availability
+from app.db.connection import get_connection
+from app.models.appointment import Appointment
+from app.models.medspa import Medspa
+from app.models.opening_hours import OpeningHours
+
+MAX_DAYS = 31
+DEFAULT_STEP = 15
+MAX_MINUTES = 24 * 60
+
+def _minutes(query_params, name, default=None):
+    value = query_params.get(name, default)
+    if value is None:
+        raise ValueError(f"{name} is required")
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer number of minutes")
+    if minutes < 1 or minutes > MAX_MINUTES:
+        raise ValueError(f"{name} must be between 1 and {MAX_MINUTES} minutes")
+    return timedelta(minutes=minutes)
+
+def parse_params(query_params):
+    """Read date, days, duration and step from the query string"""
+    try:
+        first_day = datetime.strptime(query_params.get('date', ''), '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError("date is required, in YYYY-MM-DD format")
+    try:
+        days = int(query_params.get('days', 1))
+    except (TypeError, ValueError):
+        raise ValueError("days must be an integer")
+    if days < 1 or days > MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_DAYS}")
+    duration = _minutes(query_params, 'duration')
+    step = _minutes(query_params, 'step', DEFAULT_STEP)
+    return first_day, days, duration, step
+
+def get(medspa_id, query_params=None):
+    """Open start times at a medspa for an appointment lasting duration minutes.
+
+    Covers days dates from date, on a step-minute grid within the opening
+    hours. Reads the opening hours and the appointments of the whole range
+    with one query each and computes the free time in memory.
+    """
+    try:
+        first_day, days, duration, step = parse_params(query_params or {})
+    except ValueError as e:
+        return 400, {"error": str(e)}
+
+    conn = get_connection()
+    try:
+        hours = OpeningHours.get_by_medspa_id(medspa_id, conn)
+        if not hours:
+            if not Medspa.get_updated_at(medspa_id, conn):
+                return 404, {"error": "Medspa not found"}
+            slots = []
+        else:
+            start = datetime.combine(first_day, datetime.min.time())
+            end = start + timedelta(days=days)
+            busy = Appointment.get_busy_intervals(medspa_id, start, end, conn)
+            slots = availability.free_slots(hours, busy, first_day, days, duration, step,
+                                            not_before=datetime.now())
+        return 200, {
+            'medspa_id': medspa_id,
+            'duration': duration // timedelta(minutes=1),
+            'step': step // timedelta(minutes=1),
+            'slots': slots
+        }
+    except Exception as e:
+        return 500, {"error": str(e)}
+    finally:
+        conn.close()
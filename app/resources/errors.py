@@ -0,0 +1,11 @@
+def service_attachment_error(e):
+    """Response for a ServiceAttachmentError: 404 for unknown services, 400 for another medspa's"""
+    return 404 if e.missing else 400, {
+        "error": str(e),
+        "missing_service_ids": e.missing,
+        "foreign_service_ids": e.foreign
+    }
+
+def appointment_conflict(e):
+    """409 response for an AppointmentConflictError, naming the overlapped appointments"""
+    return 409, {"error": str(e), "conflicting_appointment_ids": e.conflicting_ids}
\ No newline at end of file
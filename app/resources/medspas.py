@@ -1,30 +1,48 @@
 from app.models.medspa import Medspa
 from app.db.connection import get_connection
+from app.resources import pagination
 
-def get_all():
-    """Get all medspas"""
+def get_all(query_params=None):
+    """Get all medspas, one page at a time when limit and/or cursor are given"""
     conn = get_connection()
     try:
-        medspas = Medspa.get_all(conn)
-        return 200, [m.to_dict() for m in medspas]
+        if pagination.is_requested(query_params):
+            try:
+                limit, after = pagination.parse(query_params, str, int)
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            medspas = Medspa.get_all(conn, limit=limit + 1, after=after)
+            return 200, pagination.page(medspas, limit, lambda m: (m.name, m.id))
+        return 200, Medspa.get_all(conn)
     except Exception as e:
         return 500, {"error": str(e)}
     finally:
         conn.close()
 
-def get_by_id(medspa_id):
+def get_by_id(medspa_id, query_params=None):
     """Get a medspa by ID"""
     conn = get_connection()
     try:
         medspa = Medspa.get_by_id(medspa_id, conn)
         if medspa:
-            return 200, medspa.to_dict()
+            return 200, medspa
         return 404, {"error": "Medspa not found"}
     except Exception as e:
         return 500, {"error": str(e)}
     finally:
         conn.close()
 
+def get_updated_at(medspa_id):
+    """Get when a medspa last changed, or None if it doesn't exist"""
+    conn = get_connection()
+    try:
+        return Medspa.get_updated_at(medspa_id, conn)
+    except Exception:
+        # Fall through to get_by_id, which answers the request and reports the error
+        return None
+    finally:
+        conn.close()
+
 def create(data):
     """Create a new medspa"""
     conn = get_connection()
@@ -47,9 +65,10 @@ def update(data, medspa_id):
         if not medspa:
             return 404, {"error": "Medspa not found"}
             
-        # Update with whatever fields were provided
+        # Update with whatever known fields were provided
         for field, value in data.items():
-            setattr(medspa, field, value)
+            if field in Medspa.__slots__:
+                setattr(medspa, field, value)
         
         medspa.save(conn)
         conn.commit()
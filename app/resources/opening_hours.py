@@ -0,0 +1,38 @@
+from app.db.connection import get_connection
+from app.models.medspa import Medspa
+from app.models.opening_hours import OpeningHours
+
+def get_by_medspa(medspa_id, query_params=None):
+    """Get a medspa's weekly opening hours"""
+    conn = get_connection()
+    try:
+        hours = OpeningHours.get_by_medspa_id(medspa_id, conn)
+        if not hours and not Medspa.get_updated_at(medspa_id, conn):
+            return 404, {"error": "Medspa not found"}
+        return 200, hours
+    except Exception as e:
+        return 500, {"error": str(e)}
+    finally:
+        conn.close()
+
+def update(data, medspa_id):
+    """Replace a medspa's weekly opening hours with the list in the request body"""
+    conn = get_connection()
+    try:
+        if not Medspa.get_updated_at(medspa_id, conn):
+            return 404, {"error": "Medspa not found"}
+        if not isinstance(data, list):
+            return 400, {"error": "Opening hours must be a list"}
+
+        hours = [OpeningHours.from_dict(item, medspa_id) for item in data]
+        hours = OpeningHours.replace_for_medspa(medspa_id, hours, conn)
+        conn.commit()
+        return 200, hours
+    except ValueError as e:
+        conn.rollback()
+        return 400, {"error": str(e)}
+    except Exception as e:
+        conn.rollback()
+        return 500, {"error": str(e)}
+    finally:
+        conn.close()
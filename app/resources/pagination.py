@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+def is_requested(query_params):
+    """Pagination is opt-in: a limit or cursor switches to paged responses"""
+    return bool(query_params) and ('limit' in query_params or 'cursor' in query_params)
+
+def encode_cursor(key):
+    """Turn the sort key of the last returned row into an opaque token"""
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in key]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(token, *types):
+    """Decode a token produced by encode_cursor, converting values to the given types"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        )
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def parse(query_params, *key_types):
+    """Read limit and cursor from the query string.
+
+    Returns (limit, after) where after is the decoded sort key or None.
+    """
+    try:
+        limit = int(query_params.get('limit', DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit < 1 or limit > MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    token = query_params.get('cursor')
+    after = decode_cursor(token, *key_types) if token else None
+    return limit, after
+
+def page(rows, limit, key, serialize=None):
+    """Build a page from up to limit + 1 rows fetched after the cursor.
+
+    Models can be left as they are (serialize=None) for the server to encode.
+    """
+    items = rows[:limit]
+    next_cursor = encode_cursor(key(items[-1])) if len(rows) > limit else None
+    return {'items': [serialize(row) for row in items] if serialize else items, 'next': next_cursor}
@@ -1,16 +1,14 @@
 from app.models.service_category import ServiceCategory
 from app.db.connection import get_connection
+from app.models.catalog_cache import catalog
 
-def get_all():
+def get_all(query_params=None):
     """Get all service categories"""
-    conn = get_connection()
     try:
-        categories = ServiceCategory.get_all(conn)
-        return 200, [c.to_dict() for c in categories]
+        categories = catalog.get_all(ServiceCategory)
+        return 200, categories
     except Exception as e:
         return 500, {"error": str(e)}
-    finally:
-        conn.close()
 
 def create(data):
     """Create a new service category"""
@@ -19,6 +17,7 @@ def create(data):
         category = ServiceCategory(**data)
         category.save(conn)
         conn.commit()
+        catalog.invalidate(ServiceCategory)
         return 201, category.to_dict()
     except ValueError as e:
         conn.rollback()
@@ -1,16 +1,14 @@
 from app.models.service_product_supplier import ServiceProductSupplier
 from app.db.connection import get_connection
+from app.models.catalog_cache import catalog
 
-def get_all():
+def get_all(query_params=None):
     """Get all service product suppliers"""
-    conn = get_connection()
     try:
-        suppliers = ServiceProductSupplier.get_all(conn)
-        return 200, [s.to_dict() for s in suppliers]
+        suppliers = catalog.get_all(ServiceProductSupplier)
+        return 200, suppliers
     except Exception as e:
         return 500, {"error": str(e)}
-    finally:
-        conn.close()
 
 def create(data):
     """Create a new service product supplier"""
@@ -19,6 +17,7 @@ def create(data):
         supplier = ServiceProductSupplier(**data)
         supplier.save(conn)
         conn.commit()
+        catalog.invalidate(ServiceProductSupplier)
         return 201, supplier.to_dict()
     except ValueError as e:
         conn.rollback()
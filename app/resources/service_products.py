@@ -1,16 +1,14 @@
 from app.models.service_product import ServiceProduct
 from app.db.connection import get_connection
+from app.models.catalog_cache import catalog
 
-def get_all():
+def get_all(query_params=None):
     """Get all service products"""
-    conn = get_connection()
     try:
-        products = ServiceProduct.get_all(conn)
-        return 200, [p.to_dict() for p in products]
+        products = catalog.get_all(ServiceProduct)
+        return 200, products
     except Exception as e:
         return 500, {"error": str(e)}
-    finally:
-        conn.close()
 
 def create(data):
     """Create a new service product"""
@@ -19,6 +17,7 @@ def create(data):
         product = ServiceProduct(**data)
         product.save(conn)
         conn.commit()
+        catalog.invalidate(ServiceProduct)
         return 201, product.to_dict()
     except ValueError as e:
         conn.rollback()
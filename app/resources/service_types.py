@@ -1,16 +1,14 @@
 from app.models.service_type import ServiceType
 from app.db.connection import get_connection
+from app.models.catalog_cache import catalog
 
-def get_all():
+def get_all(query_params=None):
     """Get all service types"""
-    conn = get_connection()
     try:
-        types = ServiceType.get_all(conn)
-        return 200, [t.to_dict() for t in types]
+        types = catalog.get_all(ServiceType)
+        return 200, types
     except Exception as e:
         return 500, {"error": str(e)}
-    finally:
-        conn.close()
 
 def create(data):
     """Create a new service type"""
@@ -19,6 +17,7 @@ def create(data):
         service_type = ServiceType(**data)
         service_type.save(conn)
         conn.commit()
+        catalog.invalidate(ServiceType)
         return 201, service_type.to_dict()
     except ValueError as e:
         conn.rollback()
@@ -1,5 +1,7 @@
+from app.models.appointment import Appointment, AppointmentConflictError
 from app.models.service import Service
 from app.db.connection import get_connection
+from app.resources import errors, pagination
 
 def create(data):
     """Create a new service"""
@@ -22,15 +24,23 @@ def update(data, service_id):
     """Update a service"""
     conn = get_connection()
     try:
-        service = Service.get_by_id(service_id, conn)
-        if not service:
-            return 404, {"error": "Service not found"}
-        
-        # Update fields
+        # Only the given fields are set; save() keeps the stored values for the rest
+        service = Service()
         for field, value in data.items():
-            setattr(service, field, value)
+            if field in Service.__slots__:
+                setattr(service, field, value)
+        service.id = service_id
         
-        service.save(conn)
+        if not service.save(conn):
+            conn.rollback()
+            return 404, {"error": "Service not found"}
+        
+        # A longer duration lengthens every appointment using the service
+        try:
+            Appointment.check_overlaps(conn, service_id=service.id)
+        except AppointmentConflictError as e:
+            conn.rollback()
+            return errors.appointment_conflict(e)
         conn.commit()
         return 200, service.to_dict()
     except ValueError as e:
@@ -42,25 +52,42 @@ def update(data, service_id):
     finally:
         conn.close()
 
-def get_by_id(service_id):
+def get_by_id(service_id, query_params=None):
     """Get a service by ID"""
     conn = get_connection()
     try:
         service = Service.get_by_id(service_id, conn)
         if service:
-            return 200, service.to_dict()
+            return 200, service
         return 404, {"error": "Service not found"}
     except Exception as e:
         return 500, {"error": str(e)}
     finally:
         conn.close()
 
-def get_all_by_medspa(medspa_id):
-    """Get all services for a medspa"""
+def get_updated_at(service_id):
+    """Get when a service last changed, or None if it doesn't exist"""
+    conn = get_connection()
+    try:
+        return Service.get_updated_at(service_id, conn)
+    except Exception:
+        # Fall through to get_by_id, which answers the request and reports the error
+        return None
+    finally:
+        conn.close()
+
+def get_all_by_medspa(medspa_id, query_params=None):
+    """Get all services for a medspa, one page at a time when limit and/or cursor are given"""
     conn = get_connection()
     try:
-        services = Service.get_by_medspa_id(medspa_id, conn)
-        return 200, [s.to_dict() for s in services]
+        if pagination.is_requested(query_params):
+            try:
+                limit, after = pagination.parse(query_params, str, int)
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            services = Service.get_by_medspa_id(medspa_id, conn, limit=limit + 1, after=after)
+            return 200, pagination.page(services, limit, lambda s: (s.name, s.id))
+        return 200, Service.get_by_medspa_id(medspa_id, conn)
     except Exception as e:
         return 500, {"error": str(e)}
     finally:
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache:
+    """Process-local cache of encoded GET responses, keyed by path + query.
+
+    Entries expire after ttl seconds and the least recently used ones are
+    evicted once the cached bodies exceed max_bytes. Each entry carries a tag
+    naming the data it was built from; write handlers invalidate() their tags
+    after committing, and the TTL bounds how stale other processes can be.
+    """
+
+    def __init__(self, ttl=10, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, tag, payload, headers)
+        self._size = 0
+        self._generations = {}          # tag -> bumped on every invalidation
+
+    @property
+    def enabled(self):
+        return bool(self.ttl) and self.max_bytes > 0
+
+    def get(self, key):
+        """Return (payload, headers) for a fresh entry, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[2], entry[3]
+
+    def generation(self, tag):
+        """Read before building a response, then pass to put()"""
+        return self._generations.get(tag, 0)
+
+    def put(self, key, payload, headers, tag, generation):
+        """Store a response unless tag was invalidated since generation was read"""
+        if not self.enabled or len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if self._generations.get(tag, 0) != generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, tag, payload, headers)
+            self._size += len(payload)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, *tags):
+        """Drop every entry built from the given tags; call after the write commits"""
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key, entry in list(self._entries.items()):
+                if entry[1] in tags:
+                    self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= len(entry[2])
+
+response_cache = ResponseCache(
+    ttl=float(os.getenv('RESPONSE_CACHE_TTL', '10')),
+    max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+)
@@ -0,0 +1,92 @@
+class _Node:
+    __slots__ = ('literals', 'capture', 'handler')
+
+    def __init__(self):
+        self.literals = {}      # path segment -> _Node
+        self.capture = None     # (converter, _Node) for a <int:name> or <name> segment
+        self.handler = None
+
+def _to_int(segment):
+    if segment.isascii() and segment.isdigit():
+        return int(segment)
+    return None
+
+def _to_str(segment):
+    return segment or None
+
+CONVERTERS = {'int': _to_int, 'str': _to_str}
+
+class Router:
+    """Segment trie mapping (method, path) to a handler and its path parameters.
+
+    Route templates are literal segments plus typed captures, e.g.
+    '/medspas/<int:medspa_id>/services'. Lookup walks one node per path
+    segment, trying the literal child before the capture, so its cost depends
+    on path depth rather than on the number of routes.
+    """
+
+    def __init__(self, routes=None):
+        self._roots = {}
+        for method, table in (routes or {}).items():
+            for template, handler in table.items():
+                self.add(method, template, handler)
+
+    @staticmethod
+    def _parse_segment(segment):
+        if segment.startswith('<') and segment.endswith('>'):
+            kind, _, name = segment[1:-1].rpartition(':')
+            kind = kind or 'str'
+            if kind not in CONVERTERS or not name:
+                raise ValueError(f"Invalid route segment: {segment}")
+            return CONVERTERS[kind]
+        return None
+
+    def add(self, method, template, handler):
+        if not template.startswith('/'):
+            raise ValueError(f"Route must start with '/': {template}")
+        node = self._roots.setdefault(method, _Node())
+        for segment in template[1:].split('/'):
+            converter = self._parse_segment(segment)
+            if converter is None:
+                node = node.literals.setdefault(segment, _Node())
+            elif node.capture is None:
+                node.capture = (converter, _Node())
+                node = node.capture[1]
+            elif node.capture[0] is converter:
+                node = node.capture[1]
+            else:
+                raise ValueError(f"Conflicting capture types in route: {template}")
+        if node.handler is not None:
+            raise ValueError(f"Duplicate route: {method} {template}")
+        node.handler = handler
+
+    def _match(self, node, segments, index, params):
+        if index == len(segments):
+            return node.handler
+        segment = segments[index]
+        child = node.literals.get(segment)
+        if child is not None:
+            handler = self._match(child, segments, index + 1, params)
+            if handler is not None:
+                return handler
+        if node.capture is not None:
+            converter, child = node.capture
+            value = converter(segment)
+            if value is not None:
+                params.append(value)
+                handler = self._match(child, segments, index + 1, params)
+                if handler is not None:
+                    return handler
+                params.pop()
+        return None
+
+    def match(self, method, path):
+        """Return (handler, params) for the route matching path, or (None, None)"""
+        root = self._roots.get(method)
+        if root is None or not path.startswith('/'):
+            return None, None
+        params = []
+        handler = self._match(root, path[1:].split('/'), 0, params)
+        if handler is None:
+            return None, None
+        return handler, tuple(params)
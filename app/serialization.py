@@ -0,0 +1,117 @@
+import json
+from datetime import datetime, time
+from decimal import Decimal
+from json.encoder import encode_basestring_ascii
+from app.models.appointment import Appointment
+from app.models.medspa import Medspa
+from app.models.opening_hours import OpeningHours
+from app.models.service import Service
+from app.models.service_category import ServiceCategory
+from app.models.service_type import ServiceType
+from app.models.service_product import ServiceProduct
+from app.models.service_product_supplier import ServiceProductSupplier
+
+class CustomJSONEncoder(json.JSONEncoder):
+    """The reference encoding; also used for any value without a fast path"""
+    def default(self, obj):
+        if isinstance(obj, (datetime, time)):
+            return obj.isoformat()
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super().default(obj)
+
+_fallback = CustomJSONEncoder().encode
+
+def _float(value):
+    # Same spelling as json.dumps, including its non-standard NaN/Infinity
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return 'Infinity'
+    if value == float('-inf'):
+        return '-Infinity'
+    return float.__repr__(value)
+
+_SCALARS = {
+    str: encode_basestring_ascii,
+    int: int.__repr__,
+    float: _float,
+    bool: lambda value: 'true' if value else 'false',
+    type(None): lambda value: 'null',
+    Decimal: lambda value: _float(float(value)),
+    datetime: lambda value: '"' + value.isoformat() + '"',
+    time: lambda value: '"' + value.isoformat() + '"',
+}
+
+# Model class -> compiled function returning the JSON text of one instance
+ENCODERS = {}
+
+def encode(value):
+    """JSON text for value, identical to json.dumps(value, cls=CustomJSONEncoder)
+    with models in place of their to_dict()"""
+    value_type = type(value)
+    encoder = ENCODERS.get(value_type) or _SCALARS.get(value_type)
+    if encoder is not None:
+        return encoder(value)
+    if value_type is list or value_type is tuple:
+        # Listings hold rows of one model: use its encoder directly
+        encoder = ENCODERS.get(type(value[0])) if value else None
+        if encoder is not None and all(type(item) is type(value[0]) for item in value):
+            return '[' + ', '.join(map(encoder, value)) + ']'
+        return '[' + ', '.join([encode(item) for item in value]) + ']'
+    if value_type is dict and all(type(key) is str for key in value):
+        return '{' + ', '.join([encode_basestring_ascii(key) + ': ' + encode(item)
+                                for key, item in value.items()]) + '}'
+    return _fallback(value)
+
+def dumps(value):
+    """Encoded response body for value"""
+    return encode(value).encode()
+
+# Per-kind expression for a field value v; anything else falls back to encode()
+_KIND_EXPRESSIONS = {
+    'int': "int_repr({v}) if {v}.__class__ is int else 'null' if {v} is None else encode({v})",
+    'str': "encode_str({v}) if {v}.__class__ is str else 'null' if {v} is None else encode({v})",
+    'decimal': "encode_float(float({v})) if {v}.__class__ is Decimal else 'null' if {v} is None else encode({v})",
+    'datetime': "'\"' + {v}.isoformat() + '\"' if {v}.__class__ is datetime else 'null' if {v} is None else encode({v})",
+    'time': "'\"' + {v}.isoformat() + '\"' if {v}.__class__ is time else 'null' if {v} is None else encode({v})",
+}
+
+def compile_encoder(model):
+    """Build a function writing one model instance as JSON, from model.JSON_FIELDS.
+
+    Every model registered below declares JSON_FIELDS next to its to_dict():
+    (attribute, kind) pairs in to_dict() order, each kind a key of
+    _KIND_EXPRESSIONS. The two must list the same keys. The generated
+    code reads each attribute once, formats it with an inline type check and
+    joins the pieces in a single f-string, so no intermediate dict is built.
+    """
+    lines = [f'def encode_{model.__name__}(obj):']
+    template = []
+    for index, (name, kind) in enumerate(model.JSON_FIELDS):
+        if kind not in _KIND_EXPRESSIONS:
+            raise ValueError(f"Unknown JSON field kind for {model.__name__}.{name}: {kind}")
+        var = f'v{index}'
+        lines.append(f'    {var} = obj.{name}')
+        lines.append(f'    {var} = {_KIND_EXPRESSIONS[kind].format(v=var)}')
+        key = encode_basestring_ascii(name).replace('{', '{{').replace('}', '}}')
+        template.append(f'{key}: {{{var}}}')
+    lines.append(f"    return f'{{{{{', '.join(template)}}}}}'")
+    namespace = {
+        'int_repr': int.__repr__,
+        'encode_str': encode_basestring_ascii,
+        'encode_float': _float,
+        'encode': encode,
+        'Decimal': Decimal,
+        'datetime': datetime,
+        'time': time,
+    }
+    exec('\n'.join(lines), namespace)
+    return namespace[f'encode_{model.__name__}']
+
+def register(*models):
+    for model in models:
+        ENCODERS[model] = compile_encoder(model)
+
+register(Appointment, Medspa, OpeningHours, Service, ServiceCategory, ServiceType, ServiceProduct,
+         ServiceProductSupplier)
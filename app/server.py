@@ -1,122 +1,386 @@
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import json
-import re
-from datetime import datetime
-from decimal import Decimal
-from urllib.parse import urlparse, parse_qs
+import logging
+import signal
+import threading
+from collections.abc import Iterator
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+from app import conditional, serialization
+from app.db.connection import close_pool
+from app.db.tracing import tracer
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
+from app.response_cache import response_cache
+from app.router import Router
 from app.resources import (
-    appointments, medspas, services,
+    appointments, availability, medspas, opening_hours, services,
     service_categories, service_types,
     service_products, service_product_suppliers
 )
 
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super().default(obj)
+log = logging.getLogger(__name__)
 
-# Routing table with patterns
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Served by dispatch() itself, in the Prometheus text format, and not recorded
+METRICS_PATH = '/metrics'
+
+# Routing table: literal path segments and typed captures, compiled into ROUTER below
 ROUTES = {
     'GET': {
-        r'^/appointments$': appointments.get_all,
-        r'^/appointments/(\d+)$': appointments.get_by_id,
-        r'^/medspas$': medspas.get_all,
-        r'^/medspas/(\d+)$': medspas.get_by_id,
-        r'^/medspas/(\d+)/services$': services.get_all_by_medspa,
-        r'^/services/(\d+)$': services.get_by_id,
-        r'^/service-categories$': service_categories.get_all,
-        r'^/service-types$': service_types.get_all,
-        r'^/service-products$': service_products.get_all,
-        r'^/service-product-suppliers$': service_product_suppliers.get_all
+        '/appointments': appointments.get_all,
+        '/appointments/export': appointments.export,
+        '/appointments/<int:appointment_id>': appointments.get_by_id,
+        '/medspas': medspas.get_all,
+        '/medspas/<int:medspa_id>': medspas.get_by_id,
+        '/medspas/<int:medspa_id>/services': services.get_all_by_medspa,
+        '/medspas/<int:medspa_id>/opening-hours': opening_hours.get_by_medspa,
+        '/medspas/<int:medspa_id>/availability': availability.get,
+        '/services/<int:service_id>': services.get_by_id,
+        '/service-categories': service_categories.get_all,
+        '/service-types': service_types.get_all,
+        '/service-products': service_products.get_all,
+        '/service-product-suppliers': service_product_suppliers.get_all
     },
     'POST': {
-        r'^/appointments$': appointments.create,
-        r'^/medspas$': medspas.create,
-        r'^/services$': services.create,
-        r'^/service-categories$': service_categories.create,
-        r'^/service-types$': service_types.create,
-        r'^/service-products$': service_products.create,
-        r'^/service-product-suppliers$': service_product_suppliers.create
+        '/appointments': appointments.create,
+        '/medspas': medspas.create,
+        '/services': services.create,
+        '/service-categories': service_categories.create,
+        '/service-types': service_types.create,
+        '/service-products': service_products.create,
+        '/service-product-suppliers': service_product_suppliers.create
     },
     'PUT': {
-        r'^/appointments/(\d+)$': appointments.update,
-        r'^/services/(\d+)$': services.update
+        '/appointments/<int:appointment_id>': appointments.update,
+        '/medspas/<int:medspa_id>/opening-hours': opening_hours.update,
+        '/services/<int:service_id>': services.update
     },
     'DELETE': {
-        r'^/medspas/(\d+)$': medspas.delete
+        '/medspas/<int:medspa_id>': medspas.delete
     }
 }
 
+ROUTER = Router(ROUTES)
+
+# (method, handler) -> route template, the route label of request metrics
+ROUTE_NAMES = {(method, handler): route for method, routes in ROUTES.items() for route, handler in routes.items()}
+
+# Single-row GET handlers -> function returning the row's updated_at (or None),
+# so conditional requests can be answered without building the full body
+VALIDATORS = {
+    appointments.get_by_id: appointments.get_updated_at,
+    medspas.get_by_id: medspas.get_updated_at,
+    services.get_by_id: services.get_updated_at
+}
+
+# GET handlers whose encoded responses are cached, with the tag of the data they read
+CACHED = {
+    medspas.get_all: 'medspas',
+    services.get_all_by_medspa: 'services',
+    opening_hours.get_by_medspa: 'opening_hours',
+    service_categories.get_all: 'service_categories',
+    service_types.get_all: 'service_types',
+    service_products.get_all: 'service_products',
+    service_product_suppliers.get_all: 'service_product_suppliers'
+}
+
+# Write handlers -> cache tags dropped after they succeed
+INVALIDATES = {
+    medspas.create: ('medspas',),
+    medspas.delete: ('medspas', 'services', 'opening_hours'),
+    opening_hours.update: ('opening_hours',),
+    services.create: ('services',),
+    services.update: ('services',),
+    service_categories.create: ('service_categories',),
+    service_types.create: ('service_types',),
+    service_products.create: ('service_products',),
+    service_product_suppliers.create: ('service_product_suppliers',)
+}
+
+def encode_json(data):
+    """Encode response data; models are written by their compiled encoders, without to_dict()"""
+    return serialization.dumps(data)
+
+def is_stream(data):
+    """Resource handlers return an iterator instead of a list for streamed responses"""
+    return isinstance(data, Iterator)
+
+def close_stream(items):
+    """Release what a streamed response holds (e.g. its DB connection), even if unfinished"""
+    close = getattr(items, 'close', None)
+    if close:
+        close()
+
+class MeteredStream(Iterator):
+    """Items of a streamed response; its request is recorded once the front end closes it.
+
+    Fetching items runs queries (e.g. fetchmany() on a named cursor), so the
+    DB time of each next() is added to what the handler spent. It is measured
+    as a db_time() delta on the calling thread, since front ends may pull
+    successive items on different threads.
+    """
+
+    def __init__(self, items, finish, db_seconds=0.0):
+        self.items = items
+        self.finish = finish
+        self.db_seconds = db_seconds
+        self.response_bytes = 0
+
+    def __next__(self):
+        db_started = metrics.db_time()
+        try:
+            return next(self.items)
+        finally:
+            self.db_seconds += metrics.db_time() - db_started
+
+    def count_bytes(self, count):
+        self.response_bytes += count
+
+    def close(self):
+        db_started = metrics.db_time()
+        try:
+            close_stream(self.items)
+        finally:
+            self.db_seconds += metrics.db_time() - db_started
+            finish, self.finish = self.finish, None
+            if finish:
+                finish(db_seconds=self.db_seconds, response_bytes=self.response_bytes)
+
+def encode_json_stream(items, chunk_size=STREAM_CHUNK_SIZE):
+    """Encode an iterable as a JSON array, yielding chunks of roughly chunk_size bytes.
+
+    The concatenated chunks are identical to encode_json(list(items)). Their
+    sizes are reported to items.count_bytes(), if it has one.
+    """
+    count_bytes = getattr(items, 'count_bytes', None)
+    buffer = [b'[']
+    size = 1
+    separator = b''
+    for item in items:
+        encoded = separator + serialization.dumps(item)
+        separator = b', '
+        buffer.append(encoded)
+        size += len(encoded)
+        if size >= chunk_size:
+            chunk = b''.join(buffer)
+            if count_bytes:
+                count_bytes(len(chunk))
+            yield chunk
+            buffer = []
+            size = 0
+    buffer.append(b']')
+    chunk = b''.join(buffer)
+    if count_bytes:
+        count_bytes(len(chunk))
+    yield chunk
+
+def parse_query_params(query):
+    """Parse a URL query string"""
+    query_params = parse_qs(query)
+    # Convert lists to single values where appropriate
+    return {k: v[0] if len(v) == 1 else v for k, v in query_params.items()}
+
+def find_handler(method, path):
+    return ROUTER.match(method, path)
+
+def call_handler(method, handler, params, query, body):
+    """Invoke a resource handler and return its (status_code, data)"""
+    if method == 'GET':
+        query_params = parse_query_params(query)
+        return handler(*params, query_params) if query_params else handler(*params)
+
+    if method in ('POST', 'PUT'):
+        try:
+            data = json.loads(body.decode())
+        except ValueError:
+            return 400, {"error": "Request body must be valid JSON"}
+        return handler(data, *params)
+
+    return handler(*params)
+
+def dispatch(method, target, body=b'', headers=None):
+    """Route a request to its resource handler and return (status_code, body, response_headers).
+
+    body is the encoded JSON payload, an iterator of items for streamed
+    responses, or None for 304 Not Modified. headers are the request headers,
+    looked up by lower-case name, and are only used for conditional GETs.
+    Shared by every server front end so they all answer identically, errors
+    included: an exception escaping the handler becomes a logged 500 JSON
+    response here. Each request's latency, DB time and sizes are recorded in
+    app.metrics, and its statements are traced when app.db.tracing is enabled.
+    """
+    if target.startswith('/'):
+        path, _, query = target.partition('#')[0].partition('?')
+    else:
+        # Absolute-form target (http://host/path?query)
+        parsed_url = urlsplit(target)
+        path, query = parsed_url.path, parsed_url.query
+    if method == 'GET' and path == METRICS_PATH:
+        return 200, metrics.render(), {'Content-Type': METRICS_CONTENT_TYPE}
+
+    handler, params = find_handler(method, path)
+    route = ROUTE_NAMES.get((method, handler), 'unmatched')
+    request_bytes = len(body) if body else 0
+    started, db_started = metrics.start(method, route)
+    trace = tracer.begin(f'{method} {route}') if tracer.enabled else None
+    try:
+        status_code, payload, response_headers = respond(method, handler, params, path, query, body, headers)
+    except Exception as e:
+        log.exception("Unhandled error in %s %s", method, path)
+        status_code, payload, response_headers = 500, encode_json({"error": str(e)}), {}
+    finally:
+        if trace is not None:
+            tracer.end(trace)
+    if trace is not None and tracer.server_timing:
+        # Cached responses share their headers dict
+        response_headers = {**response_headers, 'Server-Timing': trace.server_timing()}
+    db_seconds = metrics.db_time() - db_started
+    if payload is None or type(payload) is bytes:
+        metrics.finish(method, route, status_code, started, db_seconds, request_bytes,
+                       len(payload) if payload is not None else 0)
+        return status_code, payload, response_headers
+    # A stream: finished by the front end, after the last chunk is written
+    finish = partial(metrics.finish, method, route, status_code, started, request_bytes=request_bytes)
+    return status_code, MeteredStream(payload, finish, db_seconds), response_headers
+
+def respond(method, handler, params, path, query, body, headers):
+    """Answer a routed request from the response cache, a conditional check or its handler"""
+    if not handler:
+        return 404, encode_json({"error": "Not found"}), {}
+
+    cache_tag = CACHED.get(handler) if method == 'GET' else None
+    if cache_tag:
+        # Hits skip the handler, the DB and encoding altogether
+        cache_key = (path, query)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            payload, response_headers = cached
+            if conditional.not_modified(headers, response_headers['ETag']):
+                return 304, None, response_headers
+            return 200, payload, response_headers
+        generation = response_cache.generation(cache_tag)
+
+    validator = VALIDATORS.get(handler) if method == 'GET' else None
+    if validator and conditional.is_conditional(headers):
+        # Cheap path: compare against updated_at before loading the row
+        updated_at = validator(*params)
+        if updated_at is not None:
+            etag = conditional.version_etag(params[0], updated_at)
+            if conditional.not_modified(headers, etag, updated_at):
+                return 304, None, conditional.validator_headers(etag, updated_at)
+
+    status_code, data = call_handler(method, handler, params, query, body)
+    if is_stream(data):
+        return status_code, data, {}
+    payload = encode_json(data)
+    if method != 'GET' or status_code != 200:
+        if status_code < 400 and handler in INVALIDATES:
+            response_cache.invalidate(*INVALIDATES[handler])
+        return status_code, payload, {}
+
+    updated_at = getattr(data, 'updated_at', None) if validator else None
+    if updated_at is not None:
+        etag = conditional.version_etag(params[0], updated_at)
+    else:
+        etag = conditional.body_etag(payload)
+    response_headers = conditional.validator_headers(etag, updated_at)
+    if cache_tag:
+        response_cache.put(cache_key, payload, response_headers, cache_tag, generation)
+    if conditional.not_modified(headers, etag, updated_at):
+        return 304, None, response_headers
+    return status_code, payload, response_headers
+
 class RequestHandler(BaseHTTPRequestHandler):
-    def send_json_response(self, status_code, data):
+    # HTTP/1.1 for chunked streaming, but every response closes its connection:
+    # an idle keep-alive client would hold the single server, or a worker thread,
+    # until the timeout. Keep-alive is left to async mode, where idling is cheap.
+    protocol_version = 'HTTP/1.1'
+    timeout = 10
+    # Headers and body are separate writes; with Nagle's algorithm on, the body
+    # waits for the client's delayed ACK of the headers (~40 ms per response)
+    disable_nagle_algorithm = True
+
+    def send_json_response(self, status_code, payload, headers=None):
+        """Send an encoded JSON payload, a stream of items, or a bodiless 304 (payload None)"""
+        if is_stream(payload):
+            self.send_json_stream(status_code, payload, headers)
+            return
+        self.send_response(status_code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Connection', 'close')
+        if payload is None:
+            self.end_headers()
+            return
+        if 'Content-Type' not in (headers or {}):
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_json_stream(self, status_code, items, headers=None):
+        """Write items as a JSON array with chunked transfer encoding"""
+        chunked = self.request_version == 'HTTP/1.1'
         self.send_response(status_code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.send_header('Content-Type', 'application/json')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        # HTTP/1.0 clients read the body until the connection closes
+        self.send_header('Connection', 'close')
         self.end_headers()
-        self.wfile.write(json.dumps(data, cls=CustomJSONEncoder).encode())
-
-    def parse_query_params(self):
-        """Parse query parameters from the URL"""
-        parsed_url = urlparse(self.path)
-        query_params = parse_qs(parsed_url.query)
-        # Convert lists to single values where appropriate
-        return {k: v[0] if len(v) == 1 else v for k, v in query_params.items()}
-
-    def find_handler(self, method):
-        parsed_url = urlparse(self.path)
-        path = parsed_url.path
-        routes = ROUTES.get(method, {})
-        for pattern, handler in routes.items():
-            match = re.match(pattern, path)
-            if match:
-                return handler, match.groups()
-        return None, None
+        try:
+            for chunk in encode_json_stream(items):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except Exception as e:
+            # Headers are gone already; dropping the connection tells the client the body is incomplete
+            self.close_connection = True
+            self.log_error("Streaming response aborted: %s", e)
+        finally:
+            close_stream(items)
+
+    def handle_method(self, method):
+        # Read a body whatever the method, so none is left unread on the socket
+        try:
+            content_length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            self.send_error(400, "Invalid Content-Length")
+            return
+        body = self.rfile.read(content_length) if content_length else b''
+        status_code, payload, headers = dispatch(method, self.path, body, self.headers)
+        self.send_json_response(status_code, payload, headers)
 
     def do_GET(self):
-        handler, params = self.find_handler('GET')
-        if handler:
-            query_params = self.parse_query_params()
-            if params:
-                status_code, data = handler(*params)
-            else:
-                status_code, data = handler(query_params) if query_params else handler()
-            self.send_json_response(status_code, data)
-        else:
-            self.send_json_response(404, {"error": "Not found"})
+        self.handle_method('GET')
 
     def do_POST(self):
-        handler, params = self.find_handler('POST')
-        if handler:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode())
-            
-            status_code, response_data = handler(data, *params) if params else handler(data)
-            self.send_json_response(status_code, response_data)
-        else:
-            self.send_json_response(404, {"error": "Not found"})
+        self.handle_method('POST')
 
     def do_PUT(self):
-        handler, params = self.find_handler('PUT')
-        if handler:
-            content_length = int(self.headers['Content-Length'])
-            put_data = self.rfile.read(content_length)
-            data = json.loads(put_data.decode())
-            
-            status_code, response_data = handler(data, *params)
-            self.send_json_response(status_code, response_data)
-        else:
-            self.send_json_response(404, {"error": "Not found"})
+        self.handle_method('PUT')
 
     def do_DELETE(self):
-        handler, params = self.find_handler('DELETE')
-        if handler:
-            status_code, response_data = handler(*params)
-            self.send_json_response(status_code, response_data)
-        else:
-            self.send_json_response(404, {"error": "Not found"})
+        self.handle_method('DELETE')
+
+def serve(server):
+    """Serve until SIGTERM/SIGINT, then finish in-flight requests and close the pool"""
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever() returns, so call it off the main thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        close_pool()
 
 if __name__ == '__main__':
     server = HTTPServer(('0.0.0.0', 8000), RequestHandler)
@@ -0,0 +1,74 @@
+import queue
+import threading
+from http.server import HTTPServer
+from app.db.connection import bind_thread, release_thread
+
+BUSY_BODY = b'{"error": "Server is busy"}'
+BUSY_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: %d\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n"
+    b"\r\n" % len(BUSY_BODY)
+) + BUSY_BODY
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """HTTPServer that hands accepted connections to a fixed set of worker threads.
+
+    Accepted connections wait in a bounded queue; when it is full the client
+    gets an immediate 503 instead of piling up behind the workers. Each worker
+    keeps its own pinned database connection for its whole lifetime.
+    """
+
+    def __init__(self, server_address, RequestHandlerClass, workers=8, queue_size=64,
+                 bind_and_activate=True):
+        if workers < 1:
+            raise ValueError("At least one worker thread is required")
+        self.request_queue_size = max(queue_size, 5)
+        super().__init__(server_address, RequestHandlerClass, bind_and_activate)
+        self._requests = queue.Queue(maxsize=queue_size)
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._work, name=f'http-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def process_request(self, request, client_address):
+        try:
+            self._requests.put_nowait((request, client_address))
+        except queue.Full:
+            self._reject(request)
+
+    def _reject(self, request):
+        try:
+            request.sendall(BUSY_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _work(self):
+        bind_thread()
+        try:
+            while True:
+                item = self._requests.get()
+                if item is None:
+                    break
+                request, client_address = item
+                try:
+                    self.finish_request(request, client_address)
+                except Exception:
+                    self.handle_error(request, client_address)
+                finally:
+                    self.shutdown_request(request)
+        finally:
+            release_thread()
+
+    def server_close(self):
+        """Stop accepting, let the workers drain queued requests, then join them"""
+        super().server_close()
+        for _ in self._workers:
+            self._requests.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
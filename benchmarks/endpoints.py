@@ -0,0 +1,372 @@
+"""Endpoint benchmark: every route in app.server.ROUTES against a seeded throwaway Postgres.
+
+Run from the repository root:
+
+    python -m benchmarks.endpoints [--mode threaded] [--concurrency 8] [--requests 200] \\
+        [--medspas 20] [--services 20] [--appointments 1000] [--output results.json]
+
+A temporary cluster is created with initdb (see benchmarks.fixture), migrated
+and seeded; services and appointments are counted per medspa. The server runs
+in this process in the chosen mode, on a free localhost port, and client
+threads drive one route at a time over HTTP. Each route gets --warmup
+unmeasured requests first. Reads run before writes, and every write targets
+rows of its own (new appointment slots, spare medspas to delete), so all
+requests are expected to succeed; any 4xx/5xx or connection error counts as an
+error.
+
+The report is JSON: per route and in total, throughput in requests per
+second, latency percentiles in milliseconds and database statements per
+request, counted by a cursor class installed with
+app.db.connection.set_cursor_factory. Access log lines are not written.
+Client and server share one interpreter, so compare numbers from the same
+machine and settings only.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, time as clock, timedelta
+from app.async_server import AsyncHTTPServer
+from app.db import connection
+from app.response_cache import response_cache
+from app.server import ROUTES, RequestHandler
+from benchmarks import fixture
+from main import build_server
+
+class CountingCursor(connection.TimedCursor):
+    """Cursor counting every statement executed through it, across all connections"""
+    count = 0
+    _lock = threading.Lock()
+
+    def execute(self, query, vars=None):
+        with CountingCursor._lock:
+            CountingCursor.count += 1
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        with CountingCursor._lock:
+            CountingCursor.count += 1
+        return super().executemany(query, vars_list)
+
+class QuietRequestHandler(RequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class SeedData:
+    """Ids and dates of the seeded rows that requests are built from"""
+
+    def __init__(self, conn, first_start, appointments):
+        self.first_day = first_start.date()
+        self.slot = timedelta(hours=fixture.SLOT_HOURS)
+        # New appointments are booked after the seeded ones, one slot each
+        self.free_from = first_start + appointments * self.slot
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT id FROM medspas ORDER BY id")
+            self.medspa_ids = [row[0] for row in cur.fetchall()]
+            cur.execute("SELECT medspa_id, id FROM services ORDER BY medspa_id, id")
+            self.services = {}
+            for medspa_id, service_id in cur.fetchall():
+                self.services.setdefault(medspa_id, []).append(service_id)
+            self.service_ids = [ids[0] for ids in self.services.values()]
+            cur.execute("SELECT id, medspa_id FROM appointments ORDER BY id")
+            self.appointments = cur.fetchall()
+            cur.execute("SELECT id, medspa_id FROM appointments WHERE status = 'scheduled' ORDER BY id")
+            self.scheduled = cur.fetchall()
+            cur.execute("""
+                SELECT p.id, p.type_id, t.category_id, p.supplier_id
+                FROM service_products p JOIN service_types t ON t.id = p.type_id
+                ORDER BY p.id
+            """)
+            self.products = cur.fetchall()
+        finally:
+            cur.close()
+        self.spares = []
+
+    def medspa(self, i):
+        return self.medspa_ids[i % len(self.medspa_ids)]
+
+    def day(self, i, later=0):
+        """One of the first four weeks of appointments, plus later days"""
+        return (self.first_day + timedelta(days=i % 28 + later)).isoformat()
+
+    def add_spare_medspas(self, conn, count):
+        """Create medspas with no services or appointments, for DELETE requests"""
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                INSERT INTO medspas (name, address, phone_number, email_address)
+                SELECT 'Spare ' || g, g || ' Side St', '555-0199', 'spare' || g || '@example.com'
+                FROM generate_series(%s, %s) g
+                RETURNING id
+            """, (len(self.spares) + 1, len(self.spares) + count))
+            self.spares.extend(row[0] for row in cur.fetchall())
+            conn.commit()
+        finally:
+            cur.close()
+
+def _book(data, i):
+    medspa_id = data.medspa(i)
+    start = data.free_from + (i // len(data.medspa_ids)) * data.slot
+    return {"medspa_id": medspa_id, "start_time": start.isoformat(),
+            "service_ids": data.services[medspa_id][:1]}
+
+def _reschedule(data, i):
+    _, medspa_id = data.scheduled[i % len(data.scheduled)]
+    return {"service_ids": data.services[medspa_id][:1 + i % 2]}
+
+def _new_service(data, i):
+    product_id, type_id, category_id, _ = data.products[i % len(data.products)]
+    return {"medspa_id": data.medspa(i), "category_id": category_id, "type_id": type_id,
+            "product_id": product_id, "name": f"Benchmark service {i}", "price": 120, "duration": 30}
+
+_HOURS = [{"weekday": day, "opens_at": "09:00", "closes_at": "18:00"} for day in range(6)]
+
+# (method, route) -> function of (SeedData, request number) returning (target, JSON body or None)
+SCENARIOS = {
+    ('GET', '/appointments'): lambda data, i: ('/appointments?limit=50', None),
+    ('GET', '/appointments/export'): lambda data, i: (
+        f'/appointments/export?medspa_id={data.medspa(i)}&start_date={data.day(i)}'
+        f'&end_date={data.day(i, 6)}', None),
+    ('GET', '/appointments/<int:appointment_id>'): lambda data, i: (
+        f'/appointments/{data.appointments[i % len(data.appointments)][0]}', None),
+    ('GET', '/medspas'): lambda data, i: ('/medspas', None),
+    ('GET', '/medspas/<int:medspa_id>'): lambda data, i: (f'/medspas/{data.medspa(i)}', None),
+    ('GET', '/medspas/<int:medspa_id>/services'): lambda data, i: (f'/medspas/{data.medspa(i)}/services', None),
+    ('GET', '/medspas/<int:medspa_id>/opening-hours'): lambda data, i: (
+        f'/medspas/{data.medspa(i)}/opening-hours', None),
+    ('GET', '/medspas/<int:medspa_id>/availability'): lambda data, i: (
+        f'/medspas/{data.medspa(i)}/availability?date={data.day(i)}&days=7&duration=60', None),
+    ('GET', '/services/<int:service_id>'): lambda data, i: (
+        f'/services/{data.service_ids[i % len(data.service_ids)]}', None),
+    ('GET', '/service-categories'): lambda data, i: ('/service-categories', None),
+    ('GET', '/service-types'): lambda data, i: ('/service-types', None),
+    ('GET', '/service-products'): lambda data, i: ('/service-products', None),
+    ('GET', '/service-product-suppliers'): lambda data, i: ('/service-product-suppliers', None),
+    ('POST', '/appointments'): lambda data, i: ('/appointments', _book(data, i)),
+    ('POST', '/medspas'): lambda data, i: ('/medspas', {
+        "name": f"Benchmark medspa {i}", "address": f"{i} Bench St", "phone_number": "555-0142",
+        "email_address": f"bench{i}@example.com"}),
+    ('POST', '/services'): lambda data, i: ('/services', _new_service(data, i)),
+    ('POST', '/service-categories'): lambda data, i: ('/service-categories', {"name": f"Benchmark category {i}"}),
+    ('POST', '/service-types'): lambda data, i: ('/service-types', {
+        "category_id": data.products[i % len(data.products)][2], "name": f"Benchmark type {i}"}),
+    ('POST', '/service-products'): lambda data, i: ('/service-products', {
+        "type_id": data.products[i % len(data.products)][1],
+        "supplier_id": data.products[i % len(data.products)][3], "name": f"Benchmark product {i}"}),
+    ('POST', '/service-product-suppliers'): lambda data, i: (
+        '/service-product-suppliers', {"name": f"Benchmark supplier {i}"}),
+    ('PUT', '/appointments/<int:appointment_id>'): lambda data, i: (
+        f'/appointments/{data.scheduled[i % len(data.scheduled)][0]}', _reschedule(data, i)),
+    ('PUT', '/medspas/<int:medspa_id>/opening-hours'): lambda data, i: (
+        f'/medspas/{data.medspa(i)}/opening-hours', _HOURS),
+    ('PUT', '/services/<int:service_id>'): lambda data, i: (
+        f'/services/{data.service_ids[i % len(data.service_ids)]}', {"price": 100 + i % 50}),
+    ('DELETE', '/medspas/<int:medspa_id>'): lambda data, i: (f'/medspas/{data.spares[i]}', None)
+}
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+def drive(address, method, requests, concurrency):
+    """Send [(target, body)] from concurrency client threads; returns ([(status or None, seconds)], seconds)"""
+    pending = iter(requests)
+    lock = threading.Lock()
+    results = []
+
+    def client():
+        conn = None
+        while True:
+            with lock:
+                request = next(pending, None)
+            if request is None:
+                break
+            target, body = request
+            payload = None if body is None else json.dumps(body).encode()
+            headers = {'Content-Type': 'application/json'} if payload is not None else {}
+            started = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(*address, timeout=60)
+                conn.request(method, target, payload, headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                if response.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                status = None
+                if conn is not None:
+                    conn.close()
+                    conn = None
+            results.append((status, time.perf_counter() - started))
+        if conn is not None:
+            conn.close()
+
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return results, time.perf_counter() - started
+
+def summarize(results, seconds, queries):
+    latencies = sorted(latency for _, latency in results)
+    statuses = {}
+    for status, _ in results:
+        key = str(status) if status is not None else 'error'
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        'requests': len(results),
+        'errors': sum(1 for status, _ in results if status is None or status >= 400),
+        'statuses': statuses,
+        'seconds': round(seconds, 4),
+        'throughput': round(len(results) / seconds, 1) if seconds else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3)
+        } if latencies else None,
+        'queries_per_request': round(queries / len(results), 2) if results else None
+    }
+
+def start_server(mode, workers, queue_size):
+    """Serve app.server in a background thread on a free localhost port; returns (address, stop)"""
+    if mode == 'async':
+        os.environ.setdefault('DB_POOL_MAX_SIZE', str(workers))
+        server = AsyncHTTPServer('127.0.0.1', 0, workers=workers)
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while server.server_address is None:
+            if not thread.is_alive():
+                raise RuntimeError("Async server failed to start")
+            time.sleep(0.01)
+
+        def stop():
+            server.stop()
+            thread.join()
+        return server.server_address[:2], stop
+
+    server = build_server(argparse.Namespace(mode=mode, host='127.0.0.1', port=0, workers=workers,
+                                             queue_size=queue_size))
+    server.RequestHandlerClass = QuietRequestHandler
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+        thread.join()
+        connection.close_pool()
+    return server.server_address[:2], stop
+
+def revision():
+    """Short git commit of the working tree, if available"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['single', 'threaded', 'async'], default='threaded',
+                        help='server front end, as in main.py (prefork is not supported: statements '
+                             'are counted in this process)')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--queue-size', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per route')
+    parser.add_argument('--medspas', type=int, default=20)
+    parser.add_argument('--services', type=int, default=20, help='services per medspa')
+    parser.add_argument('--appointments', type=int, default=1000, help='appointments per medspa')
+    parser.add_argument('--only', action='append', default=[], metavar='TEXT',
+                        help='run only routes whose "METHOD /route" contains TEXT (repeatable)')
+    parser.add_argument('--no-response-cache', action='store_true', help='disable the GET response cache')
+    parser.add_argument('--pg-bin', help='directory with initdb and pg_ctl')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    missing = [f'{method} {route}' for method, routes in ROUTES.items() for route in routes
+               if (method, route) not in SCENARIOS]
+    if missing:
+        raise SystemExit(f"No benchmark scenario for: {', '.join(missing)}")
+    routes = [(method, route) for method, routes in ROUTES.items() for route in routes
+              if not args.only or any(text in f'{method} {route}' for text in args.only)]
+    if args.no_response_cache:
+        response_cache.ttl = 0
+
+    with fixture.TemporaryPostgres(args.pg_bin) as postgres:
+        os.environ.update(postgres.environ())
+        print(f'Seeding {args.medspas} medspas, {args.medspas * args.services} services, '
+              f'{args.medspas * args.appointments} appointments...', file=sys.stderr)
+        # From tomorrow on, so that availability finds free slots
+        first_start = datetime.combine(date.today() + timedelta(days=1), clock(9))
+        conn = connection.connect()
+        try:
+            fixture.seed(conn, args.medspas, args.services, args.appointments, first_start)
+            data = SeedData(conn, first_start, args.appointments)
+            if ('DELETE', '/medspas/<int:medspa_id>') in routes:
+                data.add_spare_medspas(conn, args.warmup + args.requests)
+        finally:
+            conn.close()
+
+        connection.set_cursor_factory(CountingCursor)
+        address, stop = start_server(args.mode, args.workers, args.queue_size)
+        report = []
+        all_results, all_seconds, all_queries = [], 0.0, 0
+        try:
+            for method, route in routes:
+                scenario = SCENARIOS[(method, route)]
+                warmup = [scenario(data, i) for i in range(args.warmup)]
+                drive(address, method, warmup, args.concurrency)
+                measured = [scenario(data, i) for i in range(args.warmup, args.warmup + args.requests)]
+                queries = CountingCursor.count
+                results, seconds = drive(address, method, measured, args.concurrency)
+                queries = CountingCursor.count - queries
+                summary = summarize(results, seconds, queries)
+                report.append({'method': method, 'route': route, **summary})
+                all_results.extend(results)
+                all_seconds += seconds
+                all_queries += queries
+                print(f'{method:<6} {route:<45} {summary["throughput"]:>8} req/s  '
+                      f'p50 {summary["latency_ms"]["p50"]:>8} ms  p99 {summary["latency_ms"]["p99"]:>8} ms  '
+                      f'{summary["queries_per_request"]:>5} queries  {summary["errors"]} errors',
+                      file=sys.stderr)
+        finally:
+            stop()
+            connection.set_cursor_factory()
+
+    output = json.dumps({
+        'revision': revision(),
+        'date': date.today().isoformat(),
+        'config': {
+            'mode': args.mode, 'workers': args.workers, 'concurrency': args.concurrency,
+            'requests': args.requests, 'warmup': args.warmup, 'medspas': args.medspas,
+            'services_per_medspa': args.services, 'appointments_per_medspa': args.appointments,
+            'response_cache': not args.no_response_cache
+        },
+        'routes': report,
+        'total': summarize(all_results, all_seconds, all_queries)
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
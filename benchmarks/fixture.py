@@ -0,0 +1,180 @@
+"""Throwaway Postgres cluster and synthetic data for the benchmarks.
+
+TemporaryPostgres runs initdb in a temporary directory and starts a server
+listening only on a Unix socket inside it, so it never clashes with another
+Postgres on the machine. The schema comes from app/db/migrations; seed()
+fills it with deterministic medspas, services and appointments.
+
+The Postgres binaries are taken from --pg-bin, PG_BIN, the PATH or
+`pg_config --bindir`, in that order. The server needs the btree_gist
+extension (postgresql-contrib on some distributions). initdb refuses to run
+as root.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import psycopg2
+from app.db import migrate
+
+USER = 'medspa_user'
+DBNAME = 'medspa'
+
+def find_bin_dir(bin_dir=None):
+    """Directory holding initdb and pg_ctl"""
+    bin_dir = bin_dir or os.getenv('PG_BIN')
+    if bin_dir:
+        return bin_dir
+    initdb = shutil.which('initdb')
+    if initdb:
+        return os.path.dirname(initdb)
+    try:
+        return subprocess.run(['pg_config', '--bindir'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        raise RuntimeError("Postgres binaries not found; pass --pg-bin or set PG_BIN")
+
+class TemporaryPostgres:
+    """A Postgres cluster living in a temporary directory until stop()"""
+
+    def __init__(self, bin_dir=None, port=5432):
+        self.bin_dir = find_bin_dir(bin_dir)
+        self.port = port
+        self.directory = None
+
+    def _run(self, program, *args):
+        result = subprocess.run([os.path.join(self.bin_dir, program), *args],
+                                capture_output=True, text=True)
+        if result.returncode:
+            raise RuntimeError(f"{program} failed: {result.stderr.strip() or result.stdout.strip()}")
+
+    @property
+    def data_dir(self):
+        return os.path.join(self.directory, 'data')
+
+    def start(self):
+        self.directory = tempfile.mkdtemp(prefix='medspa-bench-')
+        try:
+            self._run('initdb', '-D', self.data_dir, '-U', USER, '-A', 'trust', '-E', 'UTF8', '--no-sync')
+            self._run('pg_ctl', '-D', self.data_dir, '-l', os.path.join(self.directory, 'postgres.log'),
+                      '-w', '-o', f"-p {self.port} -k {self.directory} -c listen_addresses=''", 'start')
+        except Exception:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            raise
+        conn = psycopg2.connect(host=self.directory, port=self.port, user=USER, dbname='postgres')
+        try:
+            conn.autocommit = True
+            conn.cursor().execute(f"CREATE DATABASE {DBNAME}")
+        finally:
+            conn.close()
+        return self
+
+    def stop(self):
+        if self.directory is None:
+            return
+        try:
+            self._run('pg_ctl', '-D', self.data_dir, '-m', 'fast', '-w', 'stop')
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+    def environ(self):
+        """DB_* variables pointing app.db.connection at this cluster"""
+        return {
+            'DB_HOST': self.directory,
+            'DB_PORT': str(self.port),
+            'DB_NAME': DBNAME,
+            'DB_USER': USER,
+            'DB_PASSWORD': ''
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+# Seeded appointments of a medspa start this far apart, more than the longest
+# two-service appointment, so scheduled ones never overlap
+SLOT_HOURS = 4
+
+_SEED = [
+    """
+    INSERT INTO service_categories (name)
+    SELECT 'Category ' || g FROM generate_series(1, 4) g
+    """,
+    """
+    INSERT INTO service_types (category_id, name)
+    SELECT c.id, c.name || ' type ' || g FROM service_categories c, generate_series(1, 3) g
+    """,
+    """
+    INSERT INTO service_product_suppliers (name)
+    SELECT 'Supplier ' || g FROM generate_series(1, 5) g
+    """,
+    """
+    INSERT INTO service_products (type_id, supplier_id, name)
+    SELECT t.id, 1 + (t.id + g) %% 5, t.name || ' product ' || g
+    FROM service_types t, generate_series(1, 2) g
+    """,
+    """
+    INSERT INTO medspas (name, address, phone_number, email_address)
+    SELECT 'Medspa ' || g, g || ' Main St', '555-0100', 'medspa' || g || '@example.com'
+    FROM generate_series(1, %(medspas)s) g
+    """,
+    """
+    INSERT INTO medspa_opening_hours (medspa_id, weekday, opens_at, closes_at)
+    SELECT m.id, d, '09:00', '18:00' FROM medspas m, generate_series(0, 5) d
+    """,
+    """
+    WITH products AS (SELECT array_agg(id ORDER BY id) AS ids FROM service_products)
+    INSERT INTO services (medspa_id, category_id, type_id, product_id, name, description, price, duration)
+    SELECT m.id, t.category_id, p.type_id, p.id, 'Service ' || g, 'Seeded service ' || g,
+           50 + g * 10 %% 450, 15 * (1 + g %% 6)
+    FROM medspas m
+    CROSS JOIN generate_series(1, %(services)s) g
+    CROSS JOIN products
+    JOIN service_products p ON p.id = products.ids[1 + g %% array_length(products.ids, 1)]
+    JOIN service_types t ON t.id = p.type_id
+    """,
+    """
+    WITH spas AS (SELECT array_agg(id ORDER BY id) AS ids FROM medspas)
+    INSERT INTO appointments (medspa_id, start_time, status)
+    SELECT spas.ids[1 + g %% array_length(spas.ids, 1)],
+           %(first_start)s + (g / array_length(spas.ids, 1)) * make_interval(hours => %(slot)s),
+           (CASE WHEN g %% 10 = 0 THEN 'canceled' WHEN g %% 10 < 4 THEN 'completed'
+                 ELSE 'scheduled' END)::appointment_status
+    FROM spas, generate_series(0, %(appointments)s - 1) g
+    """,
+    # One or two services of the appointment's medspa; the triggers fill in the totals
+    """
+    WITH offered AS (
+        SELECT medspa_id, array_agg(id ORDER BY id) AS ids FROM services GROUP BY medspa_id
+    )
+    INSERT INTO appointment_services (appointment_id, service_id)
+    SELECT a.id, o.ids[1 + (a.id + n) %% array_length(o.ids, 1)]
+    FROM appointments a
+    JOIN offered o ON o.medspa_id = a.medspa_id
+    CROSS JOIN generate_series(0, 1) n
+    WHERE n = 0 OR (a.id %% 2 = 0 AND array_length(o.ids, 1) > 1)
+    """
+]
+
+def seed(conn, medspas, services, appointments, first_start):
+    """Migrate an empty database and fill it with deterministic rows.
+
+    services and appointments are counted per medspa; the appointments of a
+    medspa start SLOT_HOURS apart, from first_start on.
+    """
+    migrate.apply(conn, log=lambda message: None)
+    conn.autocommit = False
+    cur = conn.cursor()
+    try:
+        params = {'medspas': medspas, 'services': services, 'appointments': appointments * medspas,
+                  'first_start': first_start, 'slot': SLOT_HOURS}
+        for statement in _SEED:
+            cur.execute(statement, params)
+        conn.commit()
+        conn.autocommit = True
+        cur.execute("VACUUM ANALYZE")
+    finally:
+        cur.close()
@@ -0,0 +1,117 @@
+"""Micro-benchmark: decoding 10k-row listings, DictCursor rows + __dict__ models versus
+plain tuples + __slots__ models.
+
+Run from the repository root:
+
+    python -m benchmarks.rows [--rows 10000] [--repeat 5]
+
+No database is needed. The DictCursor side rebuilds what the models did before
+they gained __slots__: psycopg2 DictRow objects copied field by field into
+__dict__-backed instances.
+"""
+import argparse
+import gc
+import timeit
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from psycopg2.extras import DictRow
+from app.models.appointment import Appointment
+
+class _DictCursorStub:
+    """Just enough of a DictCursor for DictRow: the column -> index map and the row width"""
+    def __init__(self, columns):
+        self.index = OrderedDict((column, i) for i, column in enumerate(columns))
+        self.description = [(column,) for column in columns]
+
+class DictAppointment:
+    """Appointment as it was before __slots__, built from a DictRow"""
+    def __init__(self, id=None, medspa_id=None, start_time=None, status='scheduled', created_at=None,
+                 updated_at=None, total_duration=0, total_price=Decimal('0')):
+        self.id = id
+        self.medspa_id = medspa_id
+        self.start_time = start_time
+        self.status = status
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.total_duration = total_duration
+        self.total_price = total_price
+
+    @staticmethod
+    def from_db_row(row):
+        return DictAppointment(
+            id=row['id'],
+            medspa_id=row['medspa_id'],
+            start_time=row['start_time'],
+            status=row['status'],
+            created_at=row['created_at'],
+            updated_at=row['updated_at'],
+            total_duration=row['total_duration'],
+            total_price=row['total_price']
+        )
+
+def make_tuples(count):
+    start = datetime(2024, 1, 15, 9, 0)
+    return [
+        (i, i % 7 + 1, start + timedelta(minutes=15 * i), ('scheduled', 'completed')[i % 2],
+         start + timedelta(seconds=i), start + timedelta(seconds=2 * i), 30 + i % 90,
+         Decimal(i % 1000) + Decimal('0.99'))
+        for i in range(1, count + 1)
+    ]
+
+def make_dict_rows(source):
+    cursor = _DictCursorStub(Appointment.__slots__)
+    rows = []
+    for values in source:
+        row = DictRow(cursor)
+        row[:] = values
+        rows.append(row)
+    return rows
+
+def measure(build):
+    """Peak bytes allocated while building the rows and models (the values are shared)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tuples = make_tuples(args.rows)
+    dict_rows = make_dict_rows(tuples)
+
+    def dict_models():
+        return [DictAppointment.from_db_row(row) for row in dict_rows]
+
+    def slot_models():
+        return [Appointment.from_db_row(row) for row in tuples]
+
+    # What the driver hands over: fresh rows of one kind or the other
+    values = [list(row) for row in tuples]
+
+    def dict_fetch():
+        return [DictAppointment.from_db_row(row) for row in make_dict_rows(values)]
+
+    def tuple_fetch():
+        return [Appointment.from_db_row(row) for row in [tuple(row) for row in values]]
+
+    old = min(timeit.repeat(dict_models, number=1, repeat=args.repeat))
+    new = min(timeit.repeat(slot_models, number=1, repeat=args.repeat))
+    old_memory = measure(dict_fetch)
+    new_memory = measure(tuple_fetch)
+    print(f'{args.rows} appointment rows')
+    print(f'  decode:  DictRow -> __dict__ model {old * 1000:7.1f} ms, '
+          f'tuple -> __slots__ model {new * 1000:7.1f} ms, {old / new:.2f}x')
+    print(f'  memory:  rows + models {old_memory / args.rows:7.0f} B/row vs '
+          f'{new_memory / args.rows:7.0f} B/row, {old_memory / new_memory:.2f}x')
+
+if __name__ == '__main__':
+    main()
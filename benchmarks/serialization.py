@@ -0,0 +1,74 @@
+"""Micro-benchmark: encoding 10k-row listings, to_dict() + json.dumps versus app.serialization.
+
+Run from the repository root:
+
+    python -m benchmarks.serialization [--rows 10000] [--repeat 5]
+
+No database is needed; rows are built in memory. The encodings are checked
+to be byte-identical before anything is timed.
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app import serialization
+from app.models.appointment import Appointment
+from app.models.medspa import Medspa
+from app.models.service import Service
+
+def make_appointments(count):
+    start = datetime(2024, 1, 15, 9, 0)
+    return [
+        Appointment(id=i, medspa_id=i % 7 + 1, start_time=start + timedelta(minutes=15 * i),
+                    status=('scheduled', 'completed', 'canceled')[i % 3],
+                    created_at=start + timedelta(seconds=i, microseconds=i),
+                    updated_at=start + timedelta(seconds=2 * i, microseconds=i),
+                    total_duration=30 + i % 90, total_price=Decimal(i % 1000) + Decimal('0.99'))
+        for i in range(1, count + 1)
+    ]
+
+def make_services(count):
+    created = datetime(2024, 1, 1, 8, 30, 15, 123456)
+    return [
+        Service(id=i, medspa_id=i % 7 + 1, category_id=1, type_id=2, product_id=3,
+                name=f'Service {i} – "deluxe"', description=None if i % 2 else f'Line\n{i}',
+                price=Decimal(i % 500) + Decimal('0.50'), duration=15 + i % 60,
+                created_at=created, updated_at=created + timedelta(days=i % 30))
+        for i in range(1, count + 1)
+    ]
+
+def make_medspas(count):
+    created = datetime(2023, 6, 1, 12, 0)
+    return [
+        Medspa(id=i, name=f'Medspa {i}', address=f'{i} Main St', phone_number='555-0100',
+               email_address=f'spa{i}@example.com', created_at=created, updated_at=created)
+        for i in range(1, count + 1)
+    ]
+
+def baseline(rows):
+    return json.dumps([row.to_dict() for row in rows], cls=serialization.CustomJSONEncoder).encode()
+
+def compiled(rows):
+    return serialization.dumps(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, make in (('appointments', make_appointments), ('services', make_services),
+                       ('medspas', make_medspas)):
+        rows = make(args.rows)
+        expected = baseline(rows)
+        if compiled(rows) != expected:
+            raise SystemExit(f'{name}: compiled encoding differs from to_dict() + json.dumps')
+        old = min(timeit.repeat(lambda: baseline(rows), number=1, repeat=args.repeat))
+        new = min(timeit.repeat(lambda: compiled(rows), number=1, repeat=args.repeat))
+        print(f'{name:<13} {args.rows} rows, {len(expected)} bytes: '
+              f'to_dict+json.dumps {old * 1000:7.1f} ms, compiled {new * 1000:7.1f} ms, '
+              f'{old / new:.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,80 @@
-from app.server import HTTPServer, RequestHandler
+import argparse
+import os
+from app.server import HTTPServer, RequestHandler, serve
+from app.threaded_server import ThreadPoolHTTPServer
+from app.prefork_server import PreforkSupervisor
+from app.async_server import AsyncHTTPServer
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Medspa appointment API server')
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVER_PORT', '8000')))
+    parser.add_argument('--mode', choices=['single', 'threaded', 'prefork', 'async'],
+                        default=os.getenv('SERVER_MODE', 'single'),
+                        help='single: one request at a time; threaded: bounded worker thread pool; '
+                             'prefork: several threaded worker processes sharing the port; '
+                             'async: asyncio connection handling with a thread pool for handlers')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', '8')),
+                        help='worker threads in threaded and async modes, per process in prefork mode')
+    parser.add_argument('--keepalive-timeout', type=float,
+                        default=float(os.getenv('SERVER_KEEPALIVE_TIMEOUT', '75')),
+                        help='seconds an idle keep-alive connection is kept open in async mode')
+    parser.add_argument('--queue-size', type=int, default=int(os.getenv('SERVER_QUEUE_SIZE', '64')),
+                        help='accepted connections allowed to wait for a worker before 503s are returned')
+    parser.add_argument('--processes', type=int, default=int(os.getenv('SERVER_PROCESSES', '0')) or None,
+                        help='worker processes in prefork mode (default: CPU count)')
+    parser.add_argument('--reuse-port', action='store_true',
+                        default=os.getenv('SERVER_REUSE_PORT', '') == '1',
+                        help='give each prefork worker its own SO_REUSEPORT socket')
+    parser.add_argument('--drain-timeout', type=float, default=float(os.getenv('SERVER_DRAIN_TIMEOUT', '30')),
+                        help='seconds prefork workers get to finish requests on shutdown')
+    return parser.parse_args()
+
+def size_pool_for_workers(workers):
+    """Make DB_POOL_MAX_SIZE at least workers: every worker thread pins a connection
+    for its lifetime, so with fewer the others would time out on every request"""
+    max_size = int(os.getenv('DB_POOL_MAX_SIZE') or 0)
+    if max_size < workers:
+        if max_size:
+            print(f'DB_POOL_MAX_SIZE={max_size} is below --workers={workers}; using {workers}', flush=True)
+        os.environ['DB_POOL_MAX_SIZE'] = str(workers)
+
+def build_server(args, sock=None):
+    """Create the server for args.mode, adopting sock when it was bound elsewhere"""
+    address = (args.host, args.port)
+    if args.mode == 'single':
+        server = HTTPServer(address, RequestHandler, bind_and_activate=sock is None)
+    else:
+        size_pool_for_workers(args.workers)
+        server = ThreadPoolHTTPServer(address, RequestHandler, workers=args.workers,
+                                      queue_size=args.queue_size, bind_and_activate=sock is None)
+    if sock is not None:
+        server.socket.close()
+        server.socket = sock
+        server.server_address = sock.getsockname()
+        server.server_name, server.server_port = server.server_address[:2]
+    return server
 
 if __name__ == '__main__':
-    server = HTTPServer(('0.0.0.0', 8000), RequestHandler)
-    print('Server running on port 8000...')
-    server.serve_forever() 
\ No newline at end of file
+    args = parse_args()
+    if args.mode == 'prefork':
+        supervisor = PreforkSupervisor(
+            (args.host, args.port),
+            lambda sock: serve(build_server(args, sock)),
+            processes=args.processes,
+            reuse_port=args.reuse_port,
+            drain_timeout=args.drain_timeout
+        )
+        print(f'Server running on port {args.port} (prefork mode, {supervisor.processes} processes)...',
+              flush=True)
+        supervisor.run()
+    elif args.mode == 'async':
+        os.environ.setdefault('DB_POOL_MAX_SIZE', str(args.workers))
+        server = AsyncHTTPServer(args.host, args.port, workers=args.workers,
+                                 keepalive_timeout=args.keepalive_timeout)
+        print(f'Server running on port {args.port} (async mode)...', flush=True)
+        server.run()
+    else:
+        server = build_server(args)
+        print(f'Server running on port {args.port} ({args.mode} mode)...', flush=True)
+        serve(server)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import argparse
+import sys
+from app.db import migrate as migrations, query_check
+from app.db.connection import connect, get_connection, close_pool
+from app.models.appointment import Appointment
+
+def migrate(args):
+    """Apply pending schema migrations, or list which are applied"""
+    conn = connect()
+    try:
+        if args.action == 'apply':
+            try:
+                applied = migrations.apply(conn)
+            except migrations.MigrationError as e:
+                print(e, file=sys.stderr)
+                return 1
+            print(f'Applied {len(applied)} migration(s)')
+            return 0
+        for migration, applied_at in migrations.status(conn):
+            print(f'{migration.name:<45} {applied_at or "pending"}')
+        return 0
+    finally:
+        conn.close()
+
+def check_queries(args):
+    """EXPLAIN every model query with sequential scans disabled and report those lacking an index"""
+    # A dedicated connection: the check swaps its cursor_factory
+    conn = connect()
+    try:
+        results = query_check.run(conn)
+    finally:
+        conn.close()
+    failed = query_check.failures(results)
+    if args.verbose:
+        for name, full_scan_ok, explained, error in results:
+            for query, tables in explained:
+                scans = f'full scan: {", ".join(tables)}' if tables else 'indexed'
+                print(f'{name:<45} {scans}{" (full scan expected)" if tables and full_scan_ok else ""}')
+    for name, problem in failed:
+        print(f'FAIL {name}: {problem}')
+    print(f'{len(results)} check(s), {len(failed)} failure(s)')
+    return 1 if failed else 0
+
+def verify_totals(args):
+    """Report appointments whose stored totals drifted from their services"""
+    conn = get_connection()
+    try:
+        drift = Appointment.find_total_drift(conn)
+    finally:
+        conn.close()
+    for appointment_id, stored, computed in drift:
+        print(f'appointment {appointment_id}: stored {stored[0]} min / {stored[1]}, '
+              f'services sum to {computed[0]} min / {computed[1]}')
+    print(f'{len(drift)} appointment(s) with drifted totals')
+    return 1 if drift else 0
+
+def recompute_totals(args):
+    """Rewrite drifted appointment totals from the linked services"""
+    conn = get_connection()
+    try:
+        fixed = Appointment.recompute_totals(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    print(f'Recomputed totals for {len(fixed)} appointment(s)')
+    return 0
+
+def find_overlaps(args):
+    """List overlapping scheduled appointments, which block migration 0006"""
+    conn = get_connection()
+    try:
+        pairs = Appointment.find_overlapping_pairs(conn)
+    finally:
+        conn.close()
+    for earlier_id, later_id in pairs:
+        print(f'appointment {later_id} overlaps appointment {earlier_id}')
+    print(f'{len(pairs)} overlapping pair(s)')
+    return 1 if pairs else 0
+
+COMMANDS = {
+    'migrate': migrate,
+    'check-queries': check_queries,
+    'verify-totals': verify_totals,
+    'recompute-totals': recompute_totals,
+    'find-overlaps': find_overlaps,
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Medspa appointment API maintenance commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help=migrate.__doc__)
+    migrate_parser.add_argument('action', choices=['apply', 'status'])
+    check_parser = subparsers.add_parser('check-queries', help=check_queries.__doc__ + '; exits 1 if any do')
+    check_parser.add_argument('-v', '--verbose', action='store_true', help='print the plan summary of every query')
+    subparsers.add_parser('verify-totals', help=verify_totals.__doc__ + '; exits 1 if any are found')
+    subparsers.add_parser('recompute-totals', help=recompute_totals.__doc__)
+    subparsers.add_parser('find-overlaps', help=find_overlaps.__doc__ + '; exits 1 if any are found')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    try:
+        sys.exit(COMMANDS[args.command](args))
+    finally:
+        close_pool()